@@ -1,9 +1,20 @@
 from django.contrib import admin
-from .models import Camera, SecurityCode
+from .models import Camera, MotionConfig, MotionEvent, RecordingSegment, SecurityCode
 @admin.register(Camera)
 class CameraAdmin(admin.ModelAdmin):
-    list_display = ("id","name","rtsp_url","created_at")
+    list_display = ("id","name","rtsp_url","created_at","retention_days","max_capture_bytes","record_continuously","rtsp_transport","keep_warm")
+@admin.register(MotionConfig)
+class MotionConfigAdmin(admin.ModelAdmin):
+    list_display = ("id","camera","enabled","analysis_width","frame_stride","threshold","min_area_ratio","cooldown_seconds")
+@admin.register(MotionEvent)
+class MotionEventAdmin(admin.ModelAdmin):
+    list_display = ("id","camera","started_at","ended_at","peak_area")
+    list_filter = ("camera",)
 @admin.register(SecurityCode)
 class SecurityCodeAdmin(admin.ModelAdmin):
     list_display = ("id","camera","token","created_at","expires_at","used")
-    readonly_fields = ("created_at",)
\ No newline at end of file
+    readonly_fields = ("created_at",)
+@admin.register(RecordingSegment)
+class RecordingSegmentAdmin(admin.ModelAdmin):
+    list_display = ("id","camera","started_at","ended_at","size_bytes")
+    list_filter = ("camera",)
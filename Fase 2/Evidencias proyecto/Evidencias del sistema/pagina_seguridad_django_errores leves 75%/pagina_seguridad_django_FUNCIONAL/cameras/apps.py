@@ -1,4 +1,7 @@
 from django.apps import AppConfig
 class CamerasConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "cameras"
\ No newline at end of file
+    name = "cameras"
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from .encoding import StreamProfile
+from .models import Capture
+from .storage import capture_name
+
+# Clip pendiente de escribir: frames como (timestamp, jpeg) y la captura a la
+# que se enlaza (por nombre de imagen, porque la fila la crea el CaptureWriter).
+ClipJob = namedtuple("ClipJob", ["camera_id", "name", "frames", "capture_image"])
+
+
+def clip_settings():
+    defaults = {
+        "enabled": True,
+        "pre_seconds": 5,
+        "post_seconds": 5,
+        "max_seconds": 30,
+        "fps": 8,
+        "buffer_bytes": 8 * 1024 * 1024,
+        "max_width": 960,
+        "quality": 70,
+        "fourcc": "mp4v",
+    }
+    defaults.update(getattr(settings, "CAPTURE_CLIPS", {}))
+    return defaults
+
+
+class FrameRing:
+    # Últimos frames de una cámara ya codificados en JPEG, acotados por
+    # segundos y por bytes (un frame crudo 1080p ocupa ~6 MB; un JPEG, ~50 KB).
+
+    def __init__(self, max_seconds, max_bytes):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.frames = deque()
+        self.bytes = 0
+
+    def push(self, timestamp, jpeg):
+        self.frames.append((timestamp, jpeg))
+        self.bytes += len(jpeg)
+        while self.frames and (
+            self.bytes > self.max_bytes or timestamp - self.frames[0][0] > self.max_seconds
+        ):
+            self.bytes -= len(self.frames.popleft()[1])
+
+    def since(self, timestamp):
+        return [item for item in self.frames if item[0] >= timestamp]
+
+
+class ClipRecorder:
+    # Alimentado por el MotionDetector con cada frame: mantiene el buffer
+    # previo y, cuando se dispara, junta pre-roll + post-roll y lo envía al
+    # ClipWriter. Nuevo movimiento durante el clip lo extiende hasta max_seconds.
+
+    def __init__(self, camera_id, options=None):
+        self.camera_id = camera_id
+        self.options = options or clip_settings()
+        self.profile = StreamProfile(self.options["max_width"], None, self.options["quality"])
+        self.interval = 1 / max(1, self.options["fps"])
+        self.ring = FrameRing(self.options["pre_seconds"], self.options["buffer_bytes"])
+        self.last_fed = 0
+        self.clip = None
+
+    def feed(self, hub, seq, frame):
+        now = time.time()
+        if now - self.last_fed < self.interval:
+            return
+        self.last_fed = now
+        # Mismo perfil que un visor equivalente: el JPEG sale de la cache del hub
+        jpeg = hub.get_jpeg(seq, frame, self.profile)
+        if jpeg is None:
+            return
+        self.ring.push(now, jpeg)
+        if self.clip is not None:
+            self.clip["frames"].append((now, jpeg))
+            if now >= self.clip["ends_at"]:
+                self.finish()
+
+    def trigger(self, capture_image):
+        now = time.time()
+        if self.clip is not None:
+            self.clip["ends_at"] = min(
+                now + self.options["post_seconds"],
+                self.clip["started_at"] + self.options["max_seconds"],
+            )
+            return
+        frames = self.ring.since(now - self.options["pre_seconds"])
+        started_at = frames[0][0] if frames else now
+        self.clip = {
+            "frames": frames,
+            "started_at": started_at,
+            "ends_at": now + self.options["post_seconds"],
+            "capture_image": capture_image,
+        }
+
+    def finish(self):
+        clip, self.clip = self.clip, None
+        if clip is None or len(clip["frames"]) < 2:
+            return
+        get_clip_writer().submit(ClipJob(
+            self.camera_id,
+            capture_name(self.camera_id, "clip", ext="mp4"),
+            clip["frames"],
+            clip["capture_image"],
+        ))
+
+
+class ClipWriter:
+    # Hilo de fondo que decodifica los JPEG del clip y escribe el MP4 con
+    # cv2.VideoWriter, fuera del bucle de detección.
+
+    def __init__(self, max_queue=16):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.orphaned = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, job):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="clip-writer", daemon=True)
+                self._thread.start()
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def close(self, timeout=30):
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    return
+                try:
+                    self._write(job)
+                except (OSError, cv2.error) as e:
+                    print(f"Error al guardar clip {job.name}: {e}")
+        finally:
+            connection.close()
+
+    def _write(self, job):
+        duration = job.frames[-1][0] - job.frames[0][0]
+        fps = (len(job.frames) - 1) / duration if duration > 0 else clip_settings()["fps"]
+        path = settings.MEDIA_ROOT / job.name
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+
+        writer = None
+        try:
+            for _, jpeg in job.frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    fourcc = cv2.VideoWriter_fourcc(*clip_settings()["fourcc"])
+                    writer = cv2.VideoWriter(str(tmp_path), fourcc, fps, (width, height))
+                    if not writer.isOpened():
+                        raise OSError("cv2.VideoWriter no pudo abrir el archivo")
+                elif frame.shape[1] != width or frame.shape[0] != height:
+                    frame = cv2.resize(frame, (width, height))
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+        if writer is None:
+            return
+        os.replace(tmp_path, path)
+
+        # La captura la inserta el CaptureWriter: reintenta si aún no existe
+        for attempt in range(5):
+            try:
+                if Capture.objects.filter(image=job.capture_image).update(
+                    clip=job.name, clip_bytes=path.stat().st_size
+                ):
+                    with self._lock:
+                        self.written += 1
+                    return
+            except OperationalError:
+                pass
+            time.sleep(0.5 * (attempt + 1))
+        # La captura nunca llegó a la BD (descartada o fallida): sin fila que
+        # lo apunte, la retención no borraría nunca el MP4
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self.orphaned += 1
+        print(f"Clip {job.name} descartado: no existe la captura {job.capture_image}")
+
+
+_clip_writer = None
+_clip_writer_lock = threading.Lock()
+
+
+def get_clip_writer():
+    global _clip_writer
+    with _clip_writer_lock:
+        if _clip_writer is None:
+            _clip_writer = ClipWriter()
+        return _clip_writer
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import cv2
+from django.conf import settings
+
+from .metrics import ENCODE_SECONDS
+
+
+class StreamProfile(namedtuple("StreamProfile", ["max_width", "fps", "quality"])):
+    # Perfil de stream: ancho máximo (None = nativo), fps máximos (None = los
+    # de la cámara) y calidad JPEG (0-100).
+    __slots__ = ()
+
+    @property
+    def encoding_key(self):
+        # Los fps solo limitan el envío: perfiles que difieren solo en fps
+        # comparten los mismos JPEG.
+        return (self.max_width, self.quality)
+
+
+DEFAULT_PROFILE = StreamProfile(max_width=None, fps=None, quality=95)
+
+# Límites para los parámetros explícitos max_width, fps y quality
+PROFILE_LIMITS = {"max_width": (160, 3840), "fps": (1, 30), "quality": (20, 95)}
+
+
+def resolve_profile(params):
+    # Construye el perfil a partir de ?profile=mobile|desktop|wall y/o de
+    # max_width, fps y quality explícitos. Lanza ValueError si son inválidos.
+    values = DEFAULT_PROFILE._asdict()
+    name = params.get("profile")
+    if name:
+        profiles = getattr(settings, "CAMERA_STREAM_PROFILES", {})
+        if name not in profiles:
+            raise ValueError(f"Perfil desconocido: {name}")
+        values.update(profiles[name])
+    for field, (low, high) in PROFILE_LIMITS.items():
+        raw = params.get(field)
+        if raw:
+            values[field] = min(max(int(raw), low), high)
+    return StreamProfile(**values)
+
+
+def encode_frame(frame, profile=DEFAULT_PROFILE):
+    height, width = frame.shape[:2]
+    if profile.max_width and width > profile.max_width:
+        size = (profile.max_width, round(height * profile.max_width / width))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, profile.quality])
+    if not ok:
+        return None
+    return jpeg.tobytes()
+
+
+class _Entry:
+    __slots__ = ("ready", "data")
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.data = None
+
+
+class EncodedFrameCache:
+    # Cache de JPEG por (seq, perfil) de una cámara: cada frame se escala y
+    # codifica una sola vez por perfil activo y los mismos bytes se entregan a
+    # todos los consumidores.
+
+    def __init__(self, max_entries=16, camera_id=None):
+        self.max_entries = max_entries
+        self.camera_id = camera_id
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, key):
+        # Bytes ya codificados, sin bloquear; None si aún no están listos
+        entry = self._entries.get(key)
+        if entry is not None and entry.ready.is_set():
+            return entry.data
+        return None
+
+    def get(self, key, frame, profile):
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if owner:
+            # Solo el primer consumidor codifica; el resto espera el resultado
+            started = time.perf_counter()
+            try:
+                entry.data = encode_frame(frame, profile)
+            finally:
+                entry.ready.set()
+                ENCODE_SECONDS.observe(time.perf_counter() - started, self.camera_id)
+        else:
+            entry.ready.wait()
+        return entry.data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,368 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+from django.conf import settings
+
+from .encoding import DEFAULT_PROFILE, EncodedFrameCache
+
+# Límite de aperturas/lecturas OpenCV simultáneas en el proceso. Se toma un
+# slot por llamada, no por hub: no limita cuántas cámaras hay activas.
+_decode_slots = threading.BoundedSemaphore(getattr(settings, "CAMERA_DECODE_WORKERS", 32))
+
+# OpenCV lee las opciones de FFmpeg de una variable de entorno global al
+# abrir la conexión: aperturas con opciones distintas (tcp/udp) no pueden
+# solaparse, las que usan las mismas sí.
+_open_cond = threading.Condition()
+_open_state = {"options": None, "active": 0}
+
+
+def capture_options(transport):
+    options = f"rtsp_transport;{transport}"
+    extra = getattr(settings, "CAMERA_CAPTURE_OPTIONS", "")
+    return f"{options}|{extra}" if extra else options
+
+
+def open_capture(url, transport="tcp"):
+    options = capture_options(transport)
+    with _open_cond:
+        _open_cond.wait_for(lambda: _open_state["active"] == 0 or _open_state["options"] == options)
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = options
+        _open_state["options"] = options
+        _open_state["active"] += 1
+    try:
+        timeout_ms = int(getattr(settings, "CAMERA_IO_TIMEOUT_SECONDS", 10) * 1000)
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms,
+        ])
+    finally:
+        with _open_cond:
+            _open_state["active"] -= 1
+            _open_cond.notify_all()
+    # Sin cola de frames atrasados: se entrega siempre el más reciente
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def _wake(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class CameraHub:
+    # Un único decodificador RTSP por cámara y proceso; los frames se reparten
+    # a todos los suscriptores del proceso (visores MJPEG y capturas manuales
+    # en el servidor web; detector y grabación en run_detectors).
+
+    def __init__(self, camera_id, rtsp_url, transport="tcp", keep_warm=False):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.transport = transport
+        # Cámaras prioritarias: conectadas desde el arranque y sin periodo de gracia
+        self.keep_warm = keep_warm
+        self.grace_seconds = getattr(settings, "CAMERA_HUB_GRACE_SECONDS", 15)
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self._idle_since = None
+        self._running = False
+        self.seq = 0
+        self.frame = None
+        self.frame_time = 0
+        # Frames leídos desde la última conexión (los primeros suelen venir grises)
+        self.stream_frames = 0
+        self.jpeg_cache = EncodedFrameCache(max_entries=32, camera_id=camera_id)
+        self._async_waiters = []
+        self.connected = False
+        self.reconnects = 0
+        # Métricas (ver cameras/metrics.py)
+        self.fps = 0.0
+        self.viewers = 0
+        self.dropped_frames = 0
+        self._fps_frames = 0
+        self._fps_since = time.monotonic()
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def subscribe(self):
+        with self._cond:
+            self._subscribers += 1
+            self._idle_since = None
+            self._start()
+
+    def start(self):
+        # Arranca el decodificador sin suscribirse (warm start)
+        with self._cond:
+            if not self._subscribers and self._idle_since is None:
+                self._idle_since = time.monotonic()
+            self._start()
+
+    def _start(self):
+        # Se llama con el lock tomado
+        if not self._running:
+            self._running = True
+            threading.Thread(
+                target=self._run,
+                name=f"camera-hub-{self.camera_id}",
+                daemon=True,
+            ).start()
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers = max(0, self._subscribers - 1)
+            if self._subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def add_viewer(self, delta):
+        with self._cond:
+            self.viewers += delta
+
+    def count_dropped(self, frames):
+        if frames > 0:
+            with self._cond:
+                self.dropped_frames += frames
+
+    @contextmanager
+    def subscription(self):
+        self.subscribe()
+        try:
+            yield self
+        finally:
+            self.unsubscribe()
+
+    def wait_frame(self, last_seq=0, timeout=None):
+        # Devuelve (seq, frame) del frame más reciente posterior a last_seq.
+        # Si se agota el timeout o el hub se detiene, frame es None.
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > last_seq or not self._running, timeout)
+            return self._latest(last_seq)
+
+    async def wait_frame_async(self, last_seq=0, timeout=None):
+        # Igual que wait_frame, pero el visor solo espera un evento del loop
+        # asyncio en vez de bloquear un hilo.
+        with self._cond:
+            if self.seq > last_seq or not self._running:
+                return self._latest(last_seq)
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._async_waiters.append((loop, fut))
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                # Con la cámara caída ningún frame vacía la lista: el visor
+                # retira su futuro al agotar el timeout (o al cancelarse).
+                if (loop, fut) in self._async_waiters:
+                    self._async_waiters.remove((loop, fut))
+        with self._cond:
+            return self._latest(last_seq)
+
+    async def snapshot_async(self, max_age=None, warmup_frames=None, timeout=10):
+        # (seq, frame) para una captura instantánea. Si el hub está activo y
+        # su último frame es reciente se devuelve sin esperar; si no, se abre
+        # la conexión y se descartan los primeros frames del arranque. La
+        # espera es un await: una cámara caída no bloquea un hilo del servidor.
+        if max_age is None:
+            max_age = getattr(settings, "CAMERA_SNAPSHOT_MAX_AGE", 2)
+        if warmup_frames is None:
+            warmup_frames = getattr(settings, "CAMERA_SNAPSHOT_WARMUP_FRAMES", 5)
+        with self._cond:
+            if self._running and self.frame is not None and time.time() - self.frame_time <= max_age:
+                return self.seq, self.frame
+            last_seq = self.seq
+        deadline = time.monotonic() + timeout
+        seq = last_seq
+        with self.subscription():
+            while True:
+                with self._cond:
+                    if self.seq > last_seq and self.frame is not None and self.stream_frames >= warmup_frames:
+                        return self.seq, self.frame
+                    if not self._running:
+                        return last_seq, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return last_seq, None
+                seq, _ = await self.wait_frame_async(seq, remaining)
+
+    def latest(self):
+        # (seq, frame) actuales sin esperar; frame es None si aún no hay ninguno
+        with self._cond:
+            return self.seq, self.frame
+
+    def _latest(self, last_seq):
+        if self.seq > last_seq and self.frame is not None:
+            return self.seq, self.frame
+        return last_seq, None
+
+    def _notify(self):
+        # Se llama con el lock tomado
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, fut)
+            except RuntimeError:
+                # El loop del visor ya se cerró
+                pass
+
+    def get_jpeg(self, seq, frame, profile=DEFAULT_PROFILE):
+        # JPEG del frame `seq` codificado una única vez por perfil
+        return self.jpeg_cache.get((seq, profile.encoding_key), frame, profile)
+
+    async def get_jpeg_async(self, seq, frame, profile=DEFAULT_PROFILE):
+        data = self.jpeg_cache.peek((seq, profile.encoding_key))
+        if data is not None:
+            return data
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_jpeg, seq, frame, profile)
+
+    def _should_stop(self):
+        # Se llama con el lock tomado: se detiene tras el periodo de gracia sin visores
+        if self.keep_warm or self._subscribers or self._idle_since is None:
+            return False
+        return time.monotonic() - self._idle_since > self.grace_seconds
+
+    def _run(self):
+        self._decode()
+
+    def _acquire_slot(self):
+        # Espera un slot de decodificación sin dejar de atender al periodo de
+        # gracia; False si el hub debe detenerse.
+        while not _decode_slots.acquire(timeout=0.5):
+            with self._cond:
+                if self._should_stop():
+                    return False
+        return True
+
+    def _decode(self):
+        # Gestor de conexión: si la cámara se cae o no abre, se reintenta con
+        # espera exponencial y jitter mientras haya alguien mirando. Los
+        # visores siguen suscritos y reciben frames en cuanto vuelve.
+        initial = getattr(settings, "CAMERA_RECONNECT_INITIAL_DELAY", 0.5)
+        maximum = getattr(settings, "CAMERA_RECONNECT_MAX_DELAY", 30)
+        delay = initial
+        try:
+            while True:
+                with self._cond:
+                    self.stream_frames = 0
+                    if self._should_stop():
+                        self._stopped()
+                        return
+                if self._read_stream():
+                    delay = initial
+                # Jitter: muchas cámaras caídas a la vez no reconectan juntas
+                wait = random.uniform(delay / 2, delay)
+                delay = min(delay * 2, maximum)
+                with self._cond:
+                    if self._cond.wait_for(self._should_stop, wait):
+                        self._stopped()
+                        return
+                    self.reconnects += 1
+        except BaseException:
+            with self._cond:
+                self._stopped()
+            raise
+
+    def _stopped(self):
+        # Se llama con el lock tomado, en el mismo bloque en que _should_stop()
+        # dio True: un subscribe() posterior ya ve _running en False y arranca
+        # otro hilo en vez de quedarse esperando a este.
+        self._running = False
+        self.connected = False
+        self._notify()
+
+    def _count_fps(self):
+        # Se llama con el lock tomado: fps medidos en ventanas de ~1 s
+        self._fps_frames += 1
+        elapsed = time.monotonic() - self._fps_since
+        if elapsed >= 1:
+            self.fps = self._fps_frames / elapsed
+            self._fps_frames = 0
+            self._fps_since = time.monotonic()
+
+    def _read_stream(self):
+        # Lee frames de una conexión hasta que falla; True si llegó a entregar alguno
+        if not self._acquire_slot():
+            return False
+        try:
+            cap = open_capture(self.rtsp_url, self.transport)
+        finally:
+            _decode_slots.release()
+        got_frames = False
+        try:
+            if not cap.isOpened():
+                return False
+            while True:
+                with self._cond:
+                    if self._should_stop():
+                        return got_frames
+                if not self._acquire_slot():
+                    return got_frames
+                try:
+                    ok, frame = cap.read()
+                finally:
+                    _decode_slots.release()
+                if not ok:
+                    return got_frames
+                got_frames = True
+                with self._cond:
+                    self.connected = True
+                    self.seq += 1
+                    self.stream_frames += 1
+                    self.frame = frame
+                    self.frame_time = time.time()
+                    self._count_fps()
+                    self._notify()
+        finally:
+            cap.release()
+            with self._cond:
+                self.connected = False
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_hub(camera):
+    with _hubs_lock:
+        hub = _hubs.get(camera.id)
+        if hub is None:
+            hub = _hubs[camera.id] = CameraHub(
+                camera.id, camera.rtsp_url, camera.rtsp_transport, camera.keep_warm
+            )
+        elif not hub.running:
+            # La URL pudo cambiar mientras el hub estaba detenido
+            hub.rtsp_url = camera.rtsp_url
+            hub.transport = camera.rtsp_transport
+        hub.keep_warm = camera.keep_warm
+        return hub
+
+
+def warm_start():
+    # Conecta las cámaras prioritarias al arrancar el proceso web, para que
+    # el primer visor no espere el handshake RTSP (ver mysite/wsgi.py y asgi.py).
+    from django.db import DatabaseError
+
+    from .models import Camera
+
+    try:
+        cameras = list(Camera.objects.filter(keep_warm=True))
+    except DatabaseError:
+        # Sin migraciones aplicadas todavía
+        return []
+    for camera in cameras:
+        get_hub(camera).start()
+    return cameras
+
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cameras.models import Capture
+from cameras.phash import dhash_jpeg
+
+
+class Command(BaseCommand):
+    help = "Calcula el hash perceptual de las capturas existentes que aún no lo tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Capturas por lote.")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Segundos de pausa entre lotes para no acaparar la BD.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        started = time.monotonic()
+        updated = missing = 0
+        last_id = 0
+
+        # Recorre por id: se puede interrumpir y volver a lanzar sin repetir trabajo
+        pending = Capture.objects.filter(phash__isnull=True).order_by("id").only("id", "image")
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            hashed = []
+            for capture in batch:
+                path = settings.MEDIA_ROOT / capture.image.name
+                try:
+                    capture.phash = dhash_jpeg(path.read_bytes())
+                except OSError:
+                    capture.phash = None
+                if capture.phash is None:
+                    missing += 1
+                else:
+                    hashed.append(capture)
+            Capture.objects.bulk_update(hashed, ["phash"])
+            updated += len(hashed)
+            time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} capturas con hash; {missing} sin archivo legible "
+            f"({time.monotonic() - started:.1f} s)."
+        ))
@@ -0,0 +1,264 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cameras.encoding import DEFAULT_PROFILE, StreamProfile, encode_frame
+from cameras.models import MotionConfig
+from cameras.motion import MotionDetector
+from cameras.views import mjpeg_part
+
+RESOLUTIONS = {"480p": (854, 480), "1080p": (1920, 1080), "4k": (3840, 2160)}
+STAGES = ("decode", "motion", "encode", "mjpeg")
+
+
+def synthetic_video(path, size, frames, fps=15, seed=0):
+    # Fondo con ruido fijo y un rectángulo que cruza la escena: hay
+    # movimiento real para el detector y contenido realista para el JPEG.
+    width, height = size
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        raise CommandError(f"No se pudo crear el video sintético {path}")
+    box = (width // 8, height // 6)
+    try:
+        for i in range(frames):
+            frame = background.copy()
+            x = (i * width // frames) % (width - box[0])
+            y = height // 2 - box[1] // 2
+            cv2.rectangle(frame, (x, y), (x + box[0], y + box[1]), (40, 200, 240), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def percentile(values, q):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def summarize(samples_ns):
+    micros = [v / 1000 for v in samples_ns]
+    return {
+        "mean_us": round(sum(micros) / len(micros), 1) if micros else 0,
+        "p50_us": round(percentile(micros, 50), 1),
+        "p95_us": round(percentile(micros, 95), 1),
+    }
+
+
+def peak_rss_mb():
+    # En Linux, VmHWM se reinicia con exec; ru_maxrss no, y arrastraría el pico
+    # del proceso padre (que genera los vídeos de prueba) al hijo de cada fuente.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_source(name, path, frames, profiles):
+    # Se ejecuta en un proceso propio por fuente (ver Command.handle): el pico
+    # de RSS medido es el de esa fuente y no el de la más pesada anterior.
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise CommandError(f"No se pudo abrir {path}")
+    # Misma configuración de detección que una cámara nueva; se analizan
+    # todos los frames para medir el peor caso.
+    detector = MotionDetector(0, MotionConfig(frame_stride=1))
+    timings = {stage: [] for stage in STAGES}
+    encode_by_profile = {profile: [] for profile in profiles}
+    bytes_by_profile = {profile: 0 for profile in profiles}
+    size = None
+    count = 0
+    started = time.perf_counter_ns()
+    try:
+        while count < frames:
+            t0 = time.perf_counter_ns()
+            ok, frame = cap.read()
+            if not ok:
+                # Videos locales más cortos que --frames: se repiten
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = cap.read()
+                if not ok:
+                    break
+            t1 = time.perf_counter_ns()
+            detector.detect(frame)
+            t2 = time.perf_counter_ns()
+            encoded = []
+            for profile_name, profile in profiles.items():
+                e0 = time.perf_counter_ns()
+                jpeg = encode_frame(frame, profile)
+                encode_by_profile[profile_name].append(time.perf_counter_ns() - e0)
+                bytes_by_profile[profile_name] += len(jpeg or b"")
+                encoded.append(jpeg or b"")
+            t3 = time.perf_counter_ns()
+            for jpeg in encoded:
+                mjpeg_part(jpeg)
+            t4 = time.perf_counter_ns()
+
+            timings["decode"].append(t1 - t0)
+            timings["motion"].append(t2 - t1)
+            timings["encode"].append(t3 - t2)
+            timings["mjpeg"].append(t4 - t3)
+            size = frame.shape[1], frame.shape[0]
+            count += 1
+    finally:
+        cap.release()
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+
+    return {
+        "source": name,
+        "width": size[0] if size else None,
+        "height": size[1] if size else None,
+        "frames": count,
+        "fps": round(count / elapsed, 1) if elapsed else 0,
+        "stages": {stage: summarize(values) for stage, values in timings.items()},
+        "encode_profiles": {
+            profile: {**summarize(values), "avg_bytes": bytes_by_profile[profile] // max(1, count)}
+            for profile, values in encode_by_profile.items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sin cámaras del camino de video (decodificación, detección de "
+        "movimiento, JPEG y framing MJPEG) sobre videos locales o sintéticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resolutions",
+            default="480p,1080p,4k",
+            help=f"Resoluciones sintéticas separadas por coma ({', '.join(RESOLUTIONS)}).",
+        )
+        parser.add_argument("--video", action="append", default=[], help="Video local a usar (repetible).")
+        parser.add_argument("--frames", type=int, default=150, help="Frames por fuente.")
+        parser.add_argument(
+            "--profile",
+            action="append",
+            default=[],
+            help="Perfiles de stream a codificar (por defecto el nativo y los de CAMERA_STREAM_PROFILES).",
+        )
+        parser.add_argument(
+            "--output",
+            help="Archivo JSON de resultados (por defecto en bench-results/ del directorio temporal).",
+        )
+        parser.add_argument("--compare", help="JSON de una ejecución anterior para mostrar diferencias.")
+
+    def handle(self, *args, **options):
+        frames = max(2, options["frames"])
+        profiles = self.profiles(options["profile"])
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            sources = [(os.path.basename(path), path) for path in options["video"]]
+            for name in filter(None, options["resolutions"].split(",")):
+                if name not in RESOLUTIONS:
+                    raise CommandError(f"Resolución desconocida: {name}")
+                path = os.path.join(tmp, f"{name}.avi")
+                synthetic_video(path, RESOLUTIONS[name], frames)
+                sources.append((name, path))
+            # "spawn": cada fuente arranca en un proceso limpio con Django configurado
+            context = multiprocessing.get_context("spawn")
+            for name, path in sources:
+                with context.Pool(1, initializer=django.setup) as pool:
+                    result = pool.apply(run_source, (name, path, frames, profiles))
+                results.append(result)
+                self.report(result)
+
+        data = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "frames": frames,
+            "profiles": {name: profile._asdict() for name, profile in profiles.items()},
+            "results": results,
+        }
+        # Fuera del árbol del proyecto salvo que se pida otra ruta con --output
+        output = options["output"] or os.path.join(
+            tempfile.gettempdir(),
+            "bench-results",
+            f"{datetime.now():%Y%m%d-%H%M%S}-{data['git_revision'] or 'local'}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(data, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {output}"))
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def profiles(self, names):
+        available = {"native": DEFAULT_PROFILE}
+        for name, values in getattr(settings, "CAMERA_STREAM_PROFILES", {}).items():
+            available[name] = StreamProfile(**{**DEFAULT_PROFILE._asdict(), **values})
+        if not names:
+            return available
+        unknown = [n for n in names if n not in available]
+        if unknown:
+            raise CommandError(f"Perfil desconocido: {', '.join(unknown)}")
+        return {name: available[name] for name in names}
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['source']} ({result['width']}x{result['height']}): "
+            f"{result['fps']} frames/s, RSS máx. {result['peak_rss_mb']} MB"
+        )
+        for stage, stats in result["stages"].items():
+            self.stdout.write(f"  {stage:<8} {stats['mean_us']:>10.1f} µs  (p95 {stats['p95_us']:.1f})")
+        for profile, stats in result["encode_profiles"].items():
+            self.stdout.write(
+                f"    jpeg {profile:<8} {stats['mean_us']:>8.1f} µs  {stats['avg_bytes'] / 1024:.0f} KB"
+            )
+
+    def compare(self, path, results):
+        with open(path) as f:
+            previous = {r["source"]: r for r in json.load(f)["results"]}
+        self.stdout.write(f"Comparación con {path}:")
+        for result in results:
+            before = previous.get(result["source"])
+            if before is None:
+                continue
+            change = (result["fps"] - before["fps"]) / before["fps"] * 100 if before["fps"] else 0
+            self.stdout.write(f"  {result['source']}: {before['fps']} -> {result['fps']} frames/s ({change:+.1f}%)")
+            for stage, stats in result["stages"].items():
+                old = before["stages"].get(stage, {}).get("mean_us")
+                if old:
+                    self.stdout.write(
+                        f"    {stage:<8} {old:.1f} -> {stats['mean_us']:.1f} µs "
+                        f"({(stats['mean_us'] - old) / old * 100:+.1f}%)"
+                    )
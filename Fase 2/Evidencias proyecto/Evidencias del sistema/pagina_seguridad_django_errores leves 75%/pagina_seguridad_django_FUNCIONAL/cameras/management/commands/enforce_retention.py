@@ -0,0 +1,248 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cameras.models import Camera, Capture, MotionEvent, RecordingSegment
+from cameras.storage import CAPTURES_ROOT, RECORDINGS_ROOT
+
+STALE_TMP_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica la retención de capturas (edad máxima, cuota de bytes por cámara y "
+        "una captura por hora pasados N días). Pensado para ejecutarse con cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Filas borradas por transacción.")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Segundos de pausa entre lotes para no acaparar la BD.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa lo que se borraría.")
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options["batch_size"])
+        self.pause = options["pause"]
+        self.dry_run = options["dry_run"]
+        started = time.monotonic()
+        now = timezone.now()
+        total_rows = total_bytes = 0
+        total_segments = segment_bytes = 0
+
+        for camera in Camera.objects.order_by("id"):
+            policy = camera.retention_policy()
+            captures = Capture.objects.filter(camera=camera)
+            rows = bytes_ = 0
+            # Ids ya elegidos por una regla anterior: una captura cuenta una
+            # sola vez aunque varias reglas la alcancen (en --dry-run siguen en la BD).
+            self.selected = set()
+
+            if policy.get("max_age_days"):
+                cutoff = now - timedelta(days=policy["max_age_days"])
+                r, b = self.delete_ids(captures.filter(created_at__lt=cutoff).order_by("id").values_list("id", flat=True))
+                rows, bytes_ = rows + r, bytes_ + b
+                if not self.dry_run:
+                    self.delete_events(camera, cutoff)
+
+            if policy.get("downsample_after_days"):
+                cutoff = now - timedelta(days=policy["downsample_after_days"])
+                r, b = self.delete_ids(self.redundant_per_hour(captures.filter(created_at__lt=cutoff)))
+                rows, bytes_ = rows + r, bytes_ + b
+
+            if policy.get("max_bytes_per_camera"):
+                r, b = self.enforce_quota(captures, policy["max_bytes_per_camera"])
+                rows, bytes_ = rows + r, bytes_ + b
+
+            if policy.get("recording_max_age_days"):
+                cutoff = now - timedelta(days=policy["recording_max_age_days"])
+                r, b = self.delete_segments(camera, cutoff)
+                total_segments, segment_bytes = total_segments + r, segment_bytes + b
+                if r:
+                    self.stdout.write(f"{camera.name}: {r} segmentos de grabación, {b / 1e6:.1f} MB")
+
+            if rows:
+                self.stdout.write(f"{camera.name}: {rows} capturas, {bytes_ / 1e6:.1f} MB")
+            total_rows += rows
+            total_bytes += bytes_
+
+        files, tmp_bytes = self.sweep_tmp_files()
+        if files:
+            self.stdout.write(f"{files} archivos temporales abandonados, {tmp_bytes / 1e6:.1f} MB")
+
+        verb = "Se borrarían" if self.dry_run else "Borradas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total_rows} capturas y {total_segments} segmentos; "
+            f"{(total_bytes + segment_bytes) / 1e6:.1f} MB recuperados "
+            f"en {time.monotonic() - started:.1f} s."
+        ))
+
+    def redundant_per_hour(self, captures):
+        # Recorre por cursor (created_at, id) y deja pasar solo la primera
+        # captura de cada hora; devuelve los ids sobrantes.
+        last_hour = None
+        cursor = None
+        while True:
+            page = captures.order_by("created_at", "id")
+            if cursor:
+                page = page.filter(created_at__gte=cursor[0]).exclude(created_at=cursor[0], id__lte=cursor[1])
+            page = list(page.values_list("id", "created_at")[:self.batch_size])
+            if not page:
+                return
+            for pk, created_at in page:
+                if pk in self.selected:
+                    continue
+                hour = created_at.replace(minute=0, second=0, microsecond=0)
+                if hour == last_hour:
+                    yield pk
+                last_hour = hour
+            cursor = (page[-1][1], page[-1][0])
+
+    def enforce_quota(self, captures, max_bytes):
+        if not self.dry_run:
+            self.fill_sizes(captures)
+        rows = captures.order_by("created_at", "id").values_list("id", "image", "size_bytes", "clip", "clip_bytes")
+        used = sum(size for _, size in self.sizes(rows))
+        if used <= max_bytes:
+            return 0, 0
+
+        # Las más antiguas primero, hasta quedar bajo la cuota
+        excess = used - max_bytes
+        ids = []
+        for pk, size in self.sizes(rows):
+            if excess <= 0:
+                break
+            ids.append(pk)
+            excess -= size
+        return self.delete_ids(ids)
+
+    def sizes(self, rows):
+        # (id, bytes de imagen + clip) de las capturas que siguen en pie; en
+        # --dry-run los tamaños vacíos se leen del disco sin guardarlos en la BD
+        for pk, image, size, clip, clip_size in rows.iterator():
+            if pk in self.selected:
+                continue
+            if size is None:
+                size = self.file_size(image)
+            if clip_size is None:
+                clip_size = self.file_size(clip) if clip else 0
+            yield pk, size + clip_size
+
+    def file_size(self, name):
+        path = settings.MEDIA_ROOT / name
+        return path.stat().st_size if path.exists() else 0
+
+    def fill_sizes(self, captures):
+        # Capturas o clips antiguos sin tamaño guardado: se calcula desde el disco
+        for field, pending in (
+            ("size_bytes", captures.filter(size_bytes__isnull=True)),
+            ("clip_bytes", captures.filter(clip_bytes__isnull=True).exclude(clip="")),
+        ):
+            file_field = "image" if field == "size_bytes" else "clip"
+            while True:
+                batch = list(pending.only("id", file_field)[:self.batch_size])
+                if not batch:
+                    break
+                for capture in batch:
+                    setattr(capture, field, self.file_size(getattr(capture, file_field).name))
+                Capture.objects.bulk_update(batch, [field])
+
+    def delete_ids(self, ids):
+        rows = bytes_ = 0
+        batch = []
+        for pk in ids:
+            if pk in self.selected:
+                continue
+            self.selected.add(pk)
+            batch.append(pk)
+            if len(batch) >= self.batch_size:
+                r, b = self.delete_batch(batch)
+                rows, bytes_ = rows + r, bytes_ + b
+                batch = []
+        if batch:
+            r, b = self.delete_batch(batch)
+            rows, bytes_ = rows + r, bytes_ + b
+        return rows, bytes_
+
+    def delete_batch(self, ids):
+        # Archivo y fila se borran juntos; cada lote es una transacción corta
+        captures = list(Capture.objects.filter(id__in=ids).only("id", "image", "clip"))
+        reclaimed = 0
+        for capture in captures:
+            for name in (capture.image.name, capture.clip.name):
+                if not name:
+                    continue
+                path = settings.MEDIA_ROOT / name
+                try:
+                    size = path.stat().st_size
+                except FileNotFoundError:
+                    size = 0
+                reclaimed += size
+                if not self.dry_run:
+                    path.unlink(missing_ok=True)
+        if not self.dry_run:
+            Capture.objects.filter(id__in=[c.id for c in captures]).delete()
+            time.sleep(self.pause)
+        return len(captures), reclaimed
+
+    def delete_events(self, camera, cutoff):
+        events = MotionEvent.objects.filter(camera=camera, ended_at__lt=cutoff)
+        while True:
+            ids = list(events.values_list("id", flat=True)[:self.batch_size])
+            if not ids:
+                return
+            MotionEvent.objects.filter(id__in=ids).delete()
+            time.sleep(self.pause)
+
+    def sweep_tmp_files(self):
+        # *.tmp.mp4 de segmentos o clips que un proceso terminado a la fuerza
+        # no llegó a renombrar. Los que se están escribiendo se modifican a
+        # cada frame: solo se borran los que llevan más de una hora quietos.
+        cutoff = time.time() - STALE_TMP_SECONDS
+        files = reclaimed = 0
+        for root in (RECORDINGS_ROOT, CAPTURES_ROOT):
+            for dirpath, _, filenames in os.walk(settings.MEDIA_ROOT / root):
+                for filename in filenames:
+                    if not filename.endswith(".tmp.mp4"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if stat.st_mtime > cutoff:
+                        continue
+                    files += 1
+                    reclaimed += stat.st_size
+                    if not self.dry_run:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+        return files, reclaimed
+
+    def delete_segments(self, camera, cutoff):
+        # Segmentos terminados antes del corte, por lotes en orden de inicio
+        segments = RecordingSegment.objects.filter(camera=camera, started_at__lt=cutoff, ended_at__lt=cutoff)
+        rows = reclaimed = 0
+        last_id = 0
+        while True:
+            batch = list(segments.filter(id__gt=last_id).order_by("id").values_list("id", "file", "size_bytes")[:self.batch_size])
+            if not batch:
+                return rows, reclaimed
+            last_id = batch[-1][0]
+            for _, name, size in batch:
+                reclaimed += size
+                if not self.dry_run:
+                    (settings.MEDIA_ROOT / name).unlink(missing_ok=True)
+            if not self.dry_run:
+                RecordingSegment.objects.filter(id__in=[pk for pk, _, _ in batch]).delete()
+                time.sleep(self.pause)
+            rows += len(batch)
@@ -0,0 +1,446 @@
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_pipeline import RESOLUTIONS, percentile, synthetic_video
+
+BOUNDARY = b"--frame\r\n"
+
+SETTINGS_TEMPLATE = """from pathlib import Path
+
+from mysite.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+DATABASES = {{"default": {{"ENGINE": "django.db.backends.sqlite3", "NAME": Path({db!r})}}}}
+MEDIA_ROOT = Path({media!r})
+CAMERA_WARM_START = False
+METRICS_ALLOWED_IPS = ["127.0.0.1"]
+"""
+
+SEED_SCRIPT = """
+import os
+from django.conf import settings
+from django.contrib.auth.models import User
+from cameras.models import Camera, Capture, MotionConfig
+
+User.objects.create_user({username!r}, password={password!r})
+cameras = [Camera.objects.create(name=f"Carga {{i}}", rtsp_url={url!r}) for i in range({cameras})]
+for camera in cameras:
+    MotionConfig.objects.create(camera=camera, enabled=False)
+os.makedirs(settings.MEDIA_ROOT / "captures", exist_ok=True)
+with open(settings.MEDIA_ROOT / "captures" / "seed.jpg", "wb") as f:
+    f.write(bytes.fromhex({jpeg!r}))
+Capture.objects.bulk_create(
+    [Capture(camera=cameras[i % len(cameras)], image="captures/seed.jpg", size_bytes={size}) for i in range({captures})],
+    batch_size=1000,
+)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeCamera:
+    # Cámara simulada: un video en bucle servido como MJPEG por HTTP a fps
+    # reales. OpenCV/FFmpeg lo abre igual que un RTSP, así el servidor hace
+    # el mismo trabajo de decodificación que con una cámara.
+
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.interval = 1 / fps
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/camera.mjpg"
+
+    def _handler(self):
+        camera = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+                index = 0
+                next_at = time.monotonic()
+                try:
+                    while True:
+                        data = camera.frames[index % len(camera.frames)]
+                        index += 1
+                        self.wfile.write(
+                            BOUNDARY + b"Content-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(data)
+                            + data + b"\r\n"
+                        )
+                        next_at += camera.interval
+                        time.sleep(max(0, next_at - time.monotonic()))
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-camera", daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class Session:
+    # Cliente HTTP mínimo con cookies (sesión de Django + CSRF)
+
+    def __init__(self, port):
+        self.port = port
+        self.cookies = SimpleCookie()
+
+    def connection(self, timeout=30):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+
+    def headers(self, extra=None):
+        headers = {"Cookie": "; ".join(f"{k}={v.value}" for k, v in self.cookies.items())}
+        headers.update(extra or {})
+        return headers
+
+    def request(self, method, path, body=None, headers=None):
+        conn = self.connection()
+        try:
+            conn.request(method, path, body=body, headers=self.headers(headers))
+            response = conn.getresponse()
+            data = response.read()
+            for value in response.headers.get_all("Set-Cookie") or []:
+                self.cookies.load(value)
+            return response.status, data
+        finally:
+            conn.close()
+
+    def login(self, username, password):
+        self.request("GET", "/login/")
+        token = self.cookies["csrftoken"].value
+        status, _ = self.request(
+            "POST",
+            "/login/",
+            body=urlencode({"username": username, "password": password, "csrfmiddlewaretoken": token}),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        if "sessionid" not in self.cookies:
+            raise CommandError(f"No se pudo iniciar sesión en el servidor de prueba (HTTP {status}).")
+
+
+def run_viewer(session, path, stop_at, result):
+    # Un visor MJPEG: cuenta los frames recibidos (separadores del multipart)
+    started = time.monotonic()
+    conn = session.connection(timeout=15)
+    try:
+        conn.request("GET", path, headers=session.headers())
+        response = conn.getresponse()
+        result["status"] = response.status
+        if response.status != 200:
+            return
+        tail = b""
+        while time.monotonic() < stop_at:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            count = data.count(BOUNDARY)
+            if count:
+                now = time.monotonic()
+                if result["frames"] == 0:
+                    result["first_frame"] = now - started
+                    result["first_at"] = now
+                result["frames"] += count
+                result["last_at"] = now
+            tail = data[-(len(BOUNDARY) - 1):]
+    except OSError as e:
+        result["error"] = str(e)
+    finally:
+        conn.close()
+
+
+def run_page_user(session, paths, stop_at, think, latencies):
+    while time.monotonic() < stop_at:
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                status, _ = session.request("GET", path)
+            except OSError:
+                status = None
+            latencies.setdefault(path, []).append((time.perf_counter() - started, status))
+        time.sleep(think)
+
+
+class ProcessSampler:
+    # CPU y RSS del proceso servidor leídos de /proc (solo Linux)
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss_mb = []
+        self._stop = threading.Event()
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def _rss(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0
+
+    def run(self):
+        try:
+            last_cpu, last_at = self._cpu_seconds(), time.monotonic()
+            while not self._stop.wait(self.interval):
+                cpu, now = self._cpu_seconds(), time.monotonic()
+                self.cpu.append((cpu - last_cpu) / (now - last_at) * 100)
+                self.rss_mb.append(self._rss())
+                last_cpu, last_at = cpu, now
+        except (OSError, ValueError, IndexError):
+            # Sin /proc (otro SO) o el servidor terminó
+            pass
+
+    def start(self):
+        threading.Thread(target=self.run, name="sampler", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga: levanta la app con una BD temporal y una cámara simulada "
+        "(video en bucle), abre N visores MJPEG y M usuarios de páginas, y mide fps "
+        "entregados, tiempo al primer frame, latencias p50/p99 y CPU/RSS del servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--viewers", type=int, default=10, help="Visores MJPEG concurrentes.")
+        parser.add_argument("--page-users", type=int, default=2, help="Usuarios navegando home y galería.")
+        parser.add_argument("--cameras", type=int, default=1, help="Cámaras (los visores se reparten).")
+        parser.add_argument("--duration", type=float, default=30, help="Segundos de medición.")
+        parser.add_argument("--ramp", type=float, default=5, help="Segundos para abrir todos los visores.")
+        parser.add_argument("--video", help="Video local para la cámara simulada (por defecto, sintético).")
+        parser.add_argument("--resolution", default="1080p", choices=list(RESOLUTIONS))
+        parser.add_argument("--fps", type=float, default=15, help="fps de la cámara simulada.")
+        parser.add_argument("--profile", help="Perfil de stream de los visores (?profile=).")
+        parser.add_argument("--captures", type=int, default=2000, help="Capturas sembradas para la galería.")
+        parser.add_argument("--think", type=float, default=0.5, help="Pausa entre páginas por usuario.")
+        parser.add_argument("--asgi", action="store_true", help="Servir con uvicorn (mysite.asgi) en vez de runserver.")
+        parser.add_argument("--output", help="Guardar los resultados en este JSON.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+            frames = self.load_frames(options, tmp)
+            camera = FakeCamera(frames, options["fps"])
+            camera.start()
+            env = self.prepare(tmp, camera.url, frames[0], options)
+            port = free_port()
+            server = self.start_server(env, port, options["asgi"])
+            try:
+                results = self.run_load(port, server.pid, options)
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                camera.stop()
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+
+    def load_frames(self, options, tmp):
+        path = options["video"]
+        if not path:
+            path = os.path.join(tmp, "source.avi")
+            synthetic_video(path, RESOLUTIONS[options["resolution"]], frames=int(options["fps"] * 10))
+        cap = cv2.VideoCapture(path)
+        frames = []
+        try:
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes())
+        finally:
+            cap.release()
+        if not frames:
+            raise CommandError(f"No se pudieron leer frames de {path}")
+        return frames
+
+    def prepare(self, tmp, camera_url, sample_jpeg, options):
+        # Settings, BD y media temporales: la prueba no toca los datos reales
+        with open(os.path.join(tmp, "loadtest_settings.py"), "w") as f:
+            f.write(SETTINGS_TEMPLATE.format(db=os.path.join(tmp, "db.sqlite3"), media=os.path.join(tmp, "media")))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([tmp, str(settings.BASE_DIR), env.get("PYTHONPATH", "")])
+        env["DJANGO_SETTINGS_MODULE"] = "loadtest_settings"
+        env.pop("CAMERA_STREAM_MODE", None)
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+
+        self.stdout.write("Preparando BD temporal...")
+        subprocess.run(manage + ["migrate", "-v0"], env=env, check=True)
+        self.username, self.password = "carga", "carga-12345"
+        seed = SEED_SCRIPT.format(
+            username=self.username,
+            password=self.password,
+            url=camera_url,
+            cameras=max(1, options["cameras"]),
+            captures=max(0, options["captures"]),
+            jpeg=sample_jpeg.hex(),
+            size=len(sample_jpeg),
+        )
+        subprocess.run(manage + ["shell", "-c", seed], env=env, check=True)
+        return env
+
+    def start_server(self, env, port, asgi):
+        if asgi:
+            command = [sys.executable, "-m", "uvicorn", "mysite.asgi:application",
+                       "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+        else:
+            command = [sys.executable, str(settings.BASE_DIR / "manage.py"), "runserver",
+                       "--noreload", f"127.0.0.1:{port}"]
+        server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"El servidor terminó al arrancar (código {server.returncode}).")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    return server
+            except OSError:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError("El servidor no respondió en 30 s.")
+
+    def run_load(self, port, pid, options):
+        session = Session(port)
+        session.login(self.username, self.password)
+        cameras = max(1, options["cameras"])
+        viewers = max(0, options["viewers"])
+        page_users = max(0, options["page_users"])
+        params = {"profile": options["profile"]} if options["profile"] else {}
+
+        sampler = ProcessSampler(pid)
+        sampler.start()
+        started = time.monotonic()
+        stop_at = started + options["ramp"] + options["duration"]
+        self.stdout.write(
+            f"{viewers} visores MJPEG y {page_users} usuarios de páginas durante "
+            f"{options['ramp'] + options['duration']:.0f} s..."
+        )
+
+        threads = []
+        latencies = {}
+        for _ in range(page_users):
+            thread = threading.Thread(
+                target=run_page_user,
+                args=(session, ["/home/", "/captures/"], stop_at, options["think"], latencies),
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        viewer_results = []
+        for i in range(viewers):
+            result = {"camera": i % cameras + 1, "frames": 0, "first_frame": None, "status": None}
+            viewer_results.append(result)
+            path = "/mjpeg_feed/?" + urlencode({"camera": result["camera"], **params})
+            thread = threading.Thread(target=run_viewer, args=(session, path, stop_at, result), daemon=True)
+            thread.start()
+            threads.append(thread)
+            if viewers > 1:
+                time.sleep(options["ramp"] / viewers)
+
+        for thread in threads:
+            thread.join(max(0, stop_at - time.monotonic()) + 20)
+        _, metrics = session.request("GET", "/metrics")
+        sampler.stop()
+        return self.summarize(options, viewer_results, latencies, sampler, metrics.decode(errors="replace"))
+
+    def summarize(self, options, viewer_results, latencies, sampler, metrics):
+        fps = []
+        for result in viewer_results:
+            if result["frames"] > 1 and result["last_at"] > result["first_at"]:
+                fps.append((result["frames"] - 1) / (result["last_at"] - result["first_at"]))
+        first_frames = [r["first_frame"] for r in viewer_results if r["first_frame"] is not None]
+        pages = {}
+        for path, samples in latencies.items():
+            times = [t for t, status in samples if status == 200]
+            pages[path] = {
+                "requests": len(samples),
+                "errors": sum(1 for _, status in samples if status != 200),
+                "p50_ms": round(percentile(times, 50) * 1000, 1),
+                "p99_ms": round(percentile(times, 99) * 1000, 1),
+            }
+        decode_fps = [
+            line for line in metrics.splitlines()
+            if line.startswith(("camera_decode_fps", "camera_jpeg_encode_seconds_count"))
+        ]
+        return {
+            "options": {k: options[k] for k in (
+                "viewers", "page_users", "cameras", "duration", "ramp", "resolution", "fps", "profile", "asgi",
+            )},
+            "viewers": {
+                "opened": len(viewer_results),
+                "receiving": len(fps),
+                "failed": sum(1 for r in viewer_results if r["status"] != 200 or r["frames"] == 0),
+                "fps_min": round(min(fps), 2) if fps else 0,
+                "fps_p50": round(statistics.median(fps), 2) if fps else 0,
+                "fps_max": round(max(fps), 2) if fps else 0,
+                "first_frame_p50_ms": round(percentile(first_frames, 50) * 1000, 1),
+                "first_frame_p99_ms": round(percentile(first_frames, 99) * 1000, 1),
+            },
+            "pages": pages,
+            "server": {
+                "cpu_avg_percent": round(statistics.mean(sampler.cpu), 1) if sampler.cpu else None,
+                "cpu_max_percent": round(max(sampler.cpu), 1) if sampler.cpu else None,
+                "rss_max_mb": round(max(sampler.rss_mb), 1) if sampler.rss_mb else None,
+            },
+            "server_metrics": decode_fps,
+        }
+
+    def report(self, results):
+        v = results["viewers"]
+        self.stdout.write(
+            f"Visores: {v['receiving']}/{v['opened']} recibiendo, {v['failed']} fallidos; "
+            f"fps entregados min/p50/max {v['fps_min']}/{v['fps_p50']}/{v['fps_max']}; "
+            f"primer frame p50 {v['first_frame_p50_ms']} ms, p99 {v['first_frame_p99_ms']} ms"
+        )
+        for path, page in results["pages"].items():
+            self.stdout.write(
+                f"{path}: {page['requests']} peticiones ({page['errors']} errores), "
+                f"p50 {page['p50_ms']} ms, p99 {page['p99_ms']} ms"
+            )
+        s = results["server"]
+        self.stdout.write(f"Servidor: CPU media {s['cpu_avg_percent']}%, máx. {s['cpu_max_percent']}%, RSS máx. {s['rss_max_mb']} MB")
+        for line in results["server_metrics"]:
+            self.stdout.write(f"  {line}")
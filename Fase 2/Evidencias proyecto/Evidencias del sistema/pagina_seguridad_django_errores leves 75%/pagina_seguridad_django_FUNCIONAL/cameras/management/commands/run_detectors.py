@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+
+class DetectorShard:
+    # Un proceso del pool: mantiene un detector por cada cámara de su partición
+    # y un grabador por cada una con grabación continua (sobre el mismo hub).
+
+    def __init__(self, index, workers):
+        self.index = index
+        self.workers = workers
+        self.running = {}  # camera_id -> (hub, thread, detector)
+        self.recorders = {}  # camera_id -> (hub, thread, recorder)
+
+    def cameras(self):
+        from cameras.models import Camera, MotionConfig
+
+        cameras = []
+        recorded = []
+        for cam in Camera.objects.select_related("motion_config"):
+            if cam.id % self.workers != self.index:
+                continue
+            config = MotionConfig.for_camera(cam)
+            if config.enabled:
+                cameras.append((cam, config))
+            if cam.record_continuously:
+                recorded.append(cam)
+        connection.close()
+        return cameras, recorded
+
+    def sync(self):
+        from cameras.hub import get_hub
+        from cameras.motion import MotionDetector
+
+        cameras, recorded = self.cameras()
+        self.sync_recorders(recorded)
+        current = {cam.id for cam, _ in cameras}
+
+        for camera_id in list(self.running):
+            if camera_id not in current:
+                hub, _, _ = self.running.pop(camera_id)
+                hub.unsubscribe()
+
+        for cam, config in cameras:
+            entry = self.running.get(cam.id)
+            if entry is not None:
+                hub, thread, detector = entry
+                if thread.is_alive():
+                    applied = detector.pending_config or detector.config
+                    if applied.updated_at != config.updated_at:
+                        detector.configure(config)
+                    continue
+                # La cámara se desconectó: se reintenta en este ciclo
+                hub.unsubscribe()
+            hub = get_hub(cam)
+            hub.subscribe()
+            detector = MotionDetector(cam.id, config)
+            thread = threading.Thread(
+                target=detector.run,
+                args=(hub,),
+                name=f"motion-{cam.id}",
+                daemon=True,
+            )
+            thread.start()
+            self.running[cam.id] = (hub, thread, detector)
+
+    def sync_recorders(self, cameras):
+        from cameras.hub import get_hub
+        from cameras.recording import SegmentRecorder
+
+        current = {cam.id for cam in cameras}
+        for camera_id in list(self.recorders):
+            if camera_id not in current:
+                hub, _, _ = self.recorders.pop(camera_id)
+                hub.unsubscribe()
+
+        for cam in cameras:
+            entry = self.recorders.get(cam.id)
+            if entry is not None:
+                hub, thread, _ = entry
+                if thread.is_alive():
+                    continue
+                hub.unsubscribe()
+            hub = get_hub(cam)
+            hub.subscribe()
+            recorder = SegmentRecorder(cam.id)
+            thread = threading.Thread(
+                target=recorder.run,
+                args=(hub,),
+                name=f"recording-{cam.id}",
+                daemon=True,
+            )
+            thread.start()
+            self.recorders[cam.id] = (hub, thread, recorder)
+
+
+def run_shard(index, workers, refresh, metrics_host=None, metrics_port=None):
+    # Con el método "spawn" el hijo arranca sin Django configurado; por eso los
+    # modelos se importan dentro de los métodos del shard.
+    if not apps.ready:
+        django.setup()
+    from cameras import metrics
+    from cameras.clips import get_clip_writer
+    from cameras.writer import get_writer
+
+    # SIGTERM también termina ordenadamente: se vacía la cola de capturas
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    if metrics_port:
+        # Un puerto por proceso: metrics_port + índice del shard
+        metrics.serve(metrics_host, metrics_port + index)
+    shard = DetectorShard(index, workers)
+    try:
+        while True:
+            shard.sync()
+            time.sleep(refresh)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        # Los clips a medias se escriben con lo que haya; las capturas van
+        # primero para que el clip encuentre su fila al enlazarse.
+        for _, _, detector in shard.running.values():
+            if detector.clips is not None:
+                detector.clips.finish()
+        for _, thread, recorder in shard.recorders.values():
+            recorder.stop()
+        for _, thread, _ in shard.recorders.values():
+            thread.join(timeout=5)
+        get_writer().close()
+        get_clip_writer().close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta la detección de movimiento y la grabación continua en segundo "
+        "plano para todas las cámaras."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Número de procesos detectores (por defecto, uno por núcleo).",
+        )
+        parser.add_argument(
+            "--refresh",
+            type=float,
+            default=30,
+            help="Segundos entre revisiones de cámaras nuevas, eliminadas o caídas.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=None,
+            help="Expone /metrics (Prometheus) en este puerto + índice de cada proceso.",
+        )
+        parser.add_argument("--metrics-host", default="127.0.0.1", help="Interfaz para --metrics-port.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        refresh = options["refresh"]
+        # Los procesos hijos no deben heredar conexiones abiertas a la BD
+        connections.close_all()
+
+        processes = {}
+        self.stdout.write(f"Iniciando {workers} procesos detectores...")
+        try:
+            while True:
+                for index in range(workers):
+                    proc = processes.get(index)
+                    if proc is not None and proc.is_alive():
+                        continue
+                    if proc is not None:
+                        self.stderr.write(f"Detector {index} terminó (código {proc.exitcode}); reiniciando.")
+                    proc = multiprocessing.Process(
+                        target=run_shard,
+                        args=(index, workers, refresh, options["metrics_host"], options["metrics_port"]),
+                        name=f"detector-{index}",
+                        daemon=True,
+                    )
+                    proc.start()
+                    processes[index] = proc
+                time.sleep(5)
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo detectores...")
+        finally:
+            for proc in processes.values():
+                proc.terminate()
+            for proc in processes.values():
+                proc.join(timeout=15)
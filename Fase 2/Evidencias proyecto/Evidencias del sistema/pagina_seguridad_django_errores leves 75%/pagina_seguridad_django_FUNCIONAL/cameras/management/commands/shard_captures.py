@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cameras.models import Capture
+from cameras.storage import CAPTURES_ROOT, capture_dir
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las capturas del directorio plano captures/ a "
+        "captures/<camara>/<AAAA>/<MM>/<DD>/ y actualiza Capture.image. "
+        "Se puede interrumpir y volver a ejecutar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Capturas por lote.")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Segundos de pausa entre lotes para no acaparar la BD.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa lo que se movería.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        dry_run = options["dry_run"]
+        started = time.monotonic()
+        moved = missing = 0
+        last_id = 0
+
+        # Solo las que siguen en el directorio plano (captures/<archivo>)
+        flat = (
+            Capture.objects.filter(image__regex=rf"^{CAPTURES_ROOT}/[^/]+$")
+            .order_by("id")
+            .only("id", "camera_id", "image", "created_at")
+        )
+        while True:
+            batch = list(flat.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for capture in batch:
+                old_name = capture.image.name
+                new_name = f"{capture_dir(capture.camera_id, capture.created_at)}/{os.path.basename(old_name)}"
+                source = settings.MEDIA_ROOT / old_name
+                target = settings.MEDIA_ROOT / new_name
+                # Si el archivo ya se movió en una ejecución interrumpida,
+                # solo falta actualizar la fila.
+                if not source.exists() and not target.exists():
+                    missing += 1
+                elif not dry_run and source.exists():
+                    os.makedirs(target.parent, exist_ok=True)
+                    os.replace(source, target)
+                capture.image.name = new_name
+            if not dry_run:
+                Capture.objects.bulk_update(batch, ["image"])
+                time.sleep(options["pause"])
+            moved += len(batch)
+
+        verb = "Se moverían" if dry_run else "Movidas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} capturas ({missing} sin archivo en disco) "
+            f"en {time.monotonic() - started:.1f} s."
+        ))
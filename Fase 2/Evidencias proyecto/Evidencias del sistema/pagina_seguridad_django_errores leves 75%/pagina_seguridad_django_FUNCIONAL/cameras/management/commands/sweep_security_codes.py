@@ -0,0 +1,97 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cameras.models import SecurityCode
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los SecurityCode expirados o usados por lotes y los PNG de "
+        "media/access_qr/ que quedaron de ellos. Pensado para ejecutarse con cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Filas borradas por transacción.")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Segundos de pausa entre lotes para no acaparar la BD.",
+        )
+        parser.add_argument(
+            "--keep-hours",
+            type=float,
+            default=0,
+            help="Conserva los códigos expirados hace menos de N horas (auditoría).",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options["batch_size"])
+        self.pause = options["pause"]
+        self.qr_dir = settings.MEDIA_ROOT / "access_qr"
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(hours=options["keep_hours"])
+
+        # Dos pasadas separadas para que cada una use su índice (expires_at y
+        # el parcial sobre used); un OR entre ambas recorrería toda la tabla.
+        expired, expired_files = self.sweep(SecurityCode.objects.filter(expires_at__lt=cutoff))
+        used, used_files = self.sweep(SecurityCode.objects.filter(used=True))
+        orphans = self.sweep_orphan_files()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Borrados {expired} códigos expirados y {used} usados; "
+            f"{expired_files + used_files + orphans} PNG de QR eliminados "
+            f"({orphans} huérfanos) en {time.monotonic() - started:.1f} s."
+        ))
+
+    def sweep(self, codes):
+        rows = files = 0
+        while True:
+            batch = list(codes.order_by("id").values_list("id", "camera_id", "token")[:self.batch_size])
+            if not batch:
+                return rows, files
+            for _, camera_id, token in batch:
+                files += self.unlink(self.qr_dir / f"access_{camera_id}_{token}.png")
+            SecurityCode.objects.filter(id__in=[pk for pk, _, _ in batch]).delete()
+            rows += len(batch)
+            time.sleep(self.pause)
+
+    def sweep_orphan_files(self):
+        # PNG de la época en que el QR se guardaba en disco y cuyo código ya
+        # no existe (los QR actuales se generan en memoria).
+        if not self.qr_dir.is_dir():
+            return 0
+        removed = 0
+        batch = []
+        with os.scandir(self.qr_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.startswith("access_") and entry.name.endswith(".png"):
+                    batch.append(entry.name)
+                if len(batch) >= self.batch_size:
+                    removed += self.unlink_orphans(batch)
+                    batch = []
+        if batch:
+            removed += self.unlink_orphans(batch)
+        try:
+            self.qr_dir.rmdir()
+        except OSError:
+            pass
+        return removed
+
+    def unlink_orphans(self, names):
+        # access_<camara>_<token>.png; el token puede contener "_"
+        tokens = {name[len("access_"):-len(".png")].partition("_")[2]: name for name in names}
+        alive = set(SecurityCode.objects.filter(token__in=list(tokens)).values_list("token", flat=True))
+        return sum(self.unlink(self.qr_dir / name) for token, name in tokens.items() if token not in alive)
+
+    def unlink(self, path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        return 1
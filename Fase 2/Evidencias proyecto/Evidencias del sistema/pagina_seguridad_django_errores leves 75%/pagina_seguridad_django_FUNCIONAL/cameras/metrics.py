@@ -0,0 +1,190 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Métricas en formato de texto de Prometheus, sin dependencias: histogramas
+# que se alimentan en caliente y colectores que leen el estado (hubs, cola
+# de escritura, disco) en el momento de la consulta.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_histograms = []
+_collectors = []
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=("camera",)):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}  # valores de etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+        _histograms.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for label_values, counts, total, count in series:
+            base = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _labels(self.labels + ("le",), label_values + (bound,))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _labels(self.labels + ("le",), label_values + ("+Inf",))
+            yield f"{self.name}_bucket{le} {count}"
+            yield f"{self.name}_sum{base} {total:.6f}"
+            yield f"{self.name}_count{base} {count}"
+
+
+def collector(fn):
+    # Registra una función que devuelve [(nombre, tipo, ayuda, [(etiquetas, valor)])]
+    _collectors.append(fn)
+    return fn
+
+
+def render(extra=()):
+    lines = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+    for fn in list(_collectors) + list(extra):
+        for name, kind, help_text, samples in fn():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Tiempos en segundos: de 0.5 ms a 1 s
+_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+ENCODE_SECONDS = Histogram(
+    "camera_jpeg_encode_seconds", "Tiempo de escalado + codificación JPEG por frame y perfil.", _SECONDS_BUCKETS
+)
+MOTION_SECONDS = Histogram(
+    "camera_motion_analysis_seconds", "Tiempo de análisis de movimiento por frame analizado.", _SECONDS_BUCKETS
+)
+CAPTURE_WRITE_SECONDS = Histogram(
+    "capture_write_latency_seconds",
+    "Desde que se encola una captura hasta que su fila está en la BD.",
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+@collector
+def hub_metrics():
+    from .hub import _hubs, _hubs_lock
+
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    now = time.time()
+    rows = {
+        "camera_decode_fps": ("gauge", "Frames decodificados por segundo."),
+        "camera_frames_decoded_total": ("counter", "Frames decodificados desde que arrancó el proceso."),
+        "camera_viewer_dropped_frames_total": ("counter", "Frames que visores sin límite de fps no alcanzaron a enviar."),
+        "camera_reconnects_total": ("counter", "Reconexiones RTSP."),
+        "camera_connected": ("gauge", "1 si la conexión RTSP está activa."),
+        "camera_last_frame_age_seconds": ("gauge", "Antigüedad del último frame decodificado."),
+        "camera_mjpeg_viewers": ("gauge", "Visores MJPEG activos."),
+        "camera_subscribers": ("gauge", "Consumidores del hub (visores, detector, grabación)."),
+    }
+    samples = {name: [] for name in rows}
+    for hub in hubs:
+        labels = {"camera": hub.camera_id}
+        samples["camera_decode_fps"].append((labels, round(hub.fps, 2) if hub.connected else 0))
+        samples["camera_frames_decoded_total"].append((labels, hub.seq))
+        samples["camera_viewer_dropped_frames_total"].append((labels, hub.dropped_frames))
+        samples["camera_reconnects_total"].append((labels, hub.reconnects))
+        samples["camera_connected"].append((labels, int(hub.connected)))
+        if hub.frame_time:
+            samples["camera_last_frame_age_seconds"].append((labels, round(now - hub.frame_time, 3)))
+        samples["camera_mjpeg_viewers"].append((labels, hub.viewers))
+        samples["camera_subscribers"].append((labels, hub.subscribers))
+    return [(name, kind, help_text, samples[name]) for name, (kind, help_text) in rows.items()]
+
+
+@collector
+def writer_metrics():
+    from . import writer
+
+    if writer._writer is None:
+        return []
+    stats = writer._writer.stats()
+    return [
+        ("capture_writer_queue_depth", "gauge", "Capturas en cola de escritura.", [({}, stats["queued"])]),
+        ("capture_writer_written_total", "counter", "Capturas escritas.", [({}, stats["written"])]),
+        ("capture_writer_dropped_total", "counter", "Capturas descartadas con la cola llena.", [({}, stats["dropped"])]),
+        ("capture_writer_failed_total", "counter", "Capturas que no se pudieron guardar.", [({}, stats["failed"])]),
+    ]
+
+
+_storage_cache = {"at": 0, "rows": []}
+
+
+def storage_metrics(max_age=60):
+    # Bytes en media/ por cámara según la BD (capturas, clips y segmentos). Es una
+    # suma sobre toda la tabla: se cachea para no repetirla en cada scrape.
+    if time.monotonic() - _storage_cache["at"] < max_age:
+        return _storage_cache["rows"]
+    from django.db.models import Sum
+
+    from .models import Capture, RecordingSegment
+
+    captures = Capture.objects.values_list("camera_id").annotate(total=Sum("size_bytes"), clips=Sum("clip_bytes"))
+    segments = RecordingSegment.objects.values_list("camera_id").annotate(total=Sum("size_bytes"))
+    rows = [
+        ("media_bytes", "gauge", "Bytes en media/ por cámara y tipo.", [
+            *[({"camera": cid, "kind": "captures"}, total or 0) for cid, total, _ in captures],
+            *[({"camera": cid, "kind": "clips"}, clips or 0) for cid, _, clips in captures],
+            *[({"camera": cid, "kind": "recordings"}, total or 0) for cid, total in segments],
+        ]),
+    ]
+    _storage_cache.update(at=time.monotonic(), rows=rows)
+    return rows
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(host, port):
+    # Servidor /metrics para procesos sin Django HTTP (p. ej. run_detectors)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"metrics-{port}", daemon=True).start()
+    return server
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MotionConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=True)),
+                ('analysis_width', models.PositiveIntegerField(default=320)),
+                ('frame_stride', models.PositiveSmallIntegerField(default=2)),
+                ('threshold', models.PositiveSmallIntegerField(default=30)),
+                ('min_area_ratio', models.FloatField(default=0.015)),
+                ('cooldown_seconds', models.FloatField(default=5)),
+                ('roi_polygons', models.JSONField(blank=True, default=list)),
+                ('exclude_polygons', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('camera', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='motion_config', to='cameras.camera')),
+            ],
+        ),
+    ]
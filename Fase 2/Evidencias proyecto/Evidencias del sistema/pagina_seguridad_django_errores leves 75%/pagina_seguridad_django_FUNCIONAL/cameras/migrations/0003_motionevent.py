@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0002_motionconfig'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='motionconfig',
+            name='event_gap_seconds',
+            field=models.FloatField(default=10),
+        ),
+        migrations.CreateModel(
+            name='MotionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('peak_area', models.FloatField(default=0)),
+                ('bbox_x', models.FloatField(default=0)),
+                ('bbox_y', models.FloatField(default=0)),
+                ('bbox_width', models.FloatField(default=0)),
+                ('bbox_height', models.FloatField(default=0)),
+                ('camera', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='cameras.camera')),
+                ('key_frame', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cameras.capture')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='capture',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='captures', to='cameras.motionevent'),
+        ),
+        migrations.AddIndex(
+            model_name='motionevent',
+            index=models.Index(fields=['camera', 'started_at'], name='cameras_mot_camera__b55fcc_idx'),
+        ),
+    ]
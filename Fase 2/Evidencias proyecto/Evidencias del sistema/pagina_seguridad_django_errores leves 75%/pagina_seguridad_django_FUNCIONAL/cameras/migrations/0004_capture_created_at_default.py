@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0003_motionevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='capture',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
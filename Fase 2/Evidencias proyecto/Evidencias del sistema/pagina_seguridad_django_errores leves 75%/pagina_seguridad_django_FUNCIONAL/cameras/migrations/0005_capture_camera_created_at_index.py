@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0004_capture_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capture',
+            index=models.Index(fields=['camera', 'created_at'], name='cameras_cap_camera__2dfff1_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0005_capture_camera_created_at_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='capture',
+            name='cameras_cap_camera__2dfff1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='capture',
+            index=models.Index(fields=['camera', 'created_at', 'id'], name='cameras_cap_camera__037b55_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='capture',
+            index=models.Index(fields=['created_at', 'id'], name='cameras_cap_created_5f2238_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0007_capture_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capture',
+            name='phash',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
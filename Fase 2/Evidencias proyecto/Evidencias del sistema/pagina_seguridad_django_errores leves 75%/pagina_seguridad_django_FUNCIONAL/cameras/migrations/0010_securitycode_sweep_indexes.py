@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0009_capture_sharded_paths'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='securitycode',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='securitycode',
+            index=models.Index(condition=models.Q(('used', True)), fields=['id'], name='securitycode_used_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:21
+
+import cameras.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0010_securitycode_sweep_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capture',
+            name='clip',
+            field=models.FileField(blank=True, max_length=200, upload_to=cameras.storage.capture_upload_to),
+        ),
+    ]
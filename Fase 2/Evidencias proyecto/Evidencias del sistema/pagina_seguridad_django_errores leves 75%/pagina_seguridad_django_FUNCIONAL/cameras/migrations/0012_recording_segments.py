@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0011_capture_clip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='record_continuously',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='camera',
+            name='recording_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='RecordingSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(max_length=200, upload_to='')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('size_bytes', models.PositiveBigIntegerField(default=0)),
+                ('camera', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='cameras.camera')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['camera', 'started_at'], name='cameras_rec_camera__cc2c14_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0012_recording_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='keep_warm',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='camera',
+            name='rtsp_transport',
+            field=models.CharField(choices=[('tcp', 'TCP'), ('udp', 'UDP')], default='tcp', max_length=3),
+        ),
+    ]
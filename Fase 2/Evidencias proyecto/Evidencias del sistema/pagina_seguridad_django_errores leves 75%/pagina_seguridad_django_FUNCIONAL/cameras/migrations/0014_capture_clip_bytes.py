@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0013_camera_connection_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capture',
+            name='clip_bytes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:53
+
+import cameras.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cameras', '0014_capture_clip_bytes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='capture',
+            name='image',
+            field=models.ImageField(db_index=True, max_length=200, upload_to=cameras.storage.capture_upload_to),
+        ),
+    ]
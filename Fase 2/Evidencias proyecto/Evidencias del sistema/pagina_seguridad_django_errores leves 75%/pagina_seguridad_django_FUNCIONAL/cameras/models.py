@@ -1,26 +1,91 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 import secrets
 from datetime import timedelta
 
+from .storage import capture_upload_to
+
 
 class Camera(models.Model):
+    TRANSPORT_CHOICES = [("tcp", "TCP"), ("udp", "UDP")]
+
     name = models.CharField(max_length=150)
     rtsp_url = models.URLField()
+    # TCP tolera redes con pérdidas; UDP da menos latencia en una LAN estable
+    rtsp_transport = models.CharField(max_length=3, choices=TRANSPORT_CHOICES, default="tcp")
+    # Prioritaria: conectada desde el arranque del servidor (ver hub.warm_start)
+    keep_warm = models.BooleanField(default=False)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Retención de capturas; None = usar CAPTURE_RETENTION (ver enforce_retention)
+    retention_days = models.PositiveIntegerField(null=True, blank=True)
+    max_capture_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    downsample_after_days = models.PositiveIntegerField(null=True, blank=True)
+    # Grabación continua en segmentos (run_detectors); opcional por cámara
+    record_continuously = models.BooleanField(default=False)
+    recording_retention_days = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
+    def retention_policy(self):
+        # Reglas efectivas: las de la cámara y, si no hay, las globales
+        policy = dict(getattr(settings, "CAPTURE_RETENTION", {}))
+        overrides = {
+            "max_age_days": self.retention_days,
+            "max_bytes_per_camera": self.max_capture_bytes,
+            "downsample_after_days": self.downsample_after_days,
+            "recording_max_age_days": self.recording_retention_days,
+        }
+        policy.update({k: v for k, v in overrides.items() if v is not None})
+        return policy
+
+
+class MotionConfig(models.Model):
+    camera = models.OneToOneField(Camera, on_delete=models.CASCADE, related_name="motion_config")
+    enabled = models.BooleanField(default=True)
+    # El análisis se hace sobre una copia reducida del frame
+    analysis_width = models.PositiveIntegerField(default=320)
+    # Analizar solo 1 de cada N frames
+    frame_stride = models.PositiveSmallIntegerField(default=2)
+    threshold = models.PositiveSmallIntegerField(default=30)
+    # Área mínima del movimiento como fracción del cuadro (0-1)
+    min_area_ratio = models.FloatField(default=0.015)
+    cooldown_seconds = models.FloatField(default=5)
+    # Segundos sin movimiento tras los que se cierra un evento
+    event_gap_seconds = models.FloatField(default=10)
+    # Polígonos en coordenadas normalizadas [[x, y], ...] (0-1). Si hay ROI,
+    # solo se analiza dentro de ellas; las exclusiones se descartan siempre.
+    roi_polygons = models.JSONField(default=list, blank=True)
+    exclude_polygons = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def for_camera(cls, camera):
+        # Configuración de la cámara, o la configuración por defecto sin guardar
+        try:
+            return camera.motion_config
+        except cls.DoesNotExist:
+            return cls(camera=camera)
+
+    def __str__(self):
+        return f"Detección de {self.camera.name}"
+
 
 class SecurityCode(models.Model):
     camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="codes")
     token = models.CharField(max_length=64, unique=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Índice parcial: solo los códigos usados (los que barre sweep_security_codes)
+            models.Index(fields=["id"], condition=models.Q(used=True), name="securitycode_used_idx"),
+        ]
+
     @classmethod
     def create_for_camera(cls, camera, lifetime_seconds=300):
         token = secrets.token_urlsafe(24)
@@ -36,10 +101,97 @@ class SecurityCode(models.Model):
         self.save(update_fields=["used"])
 
 
+class MotionEvent(models.Model):
+    # Un movimiento continuo más largo se parte en varios eventos: así una
+    # búsqueda por rango acota started_at por ambos lados (ver motion_events)
+    MAX_DURATION = timedelta(hours=1)
+
+    camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="events")
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    # Mayor área en movimiento observada, como fracción del cuadro
+    peak_area = models.FloatField(default=0)
+    # Unión de las cajas con movimiento, en coordenadas normalizadas (0-1)
+    bbox_x = models.FloatField(default=0)
+    bbox_y = models.FloatField(default=0)
+    bbox_width = models.FloatField(default=0)
+    bbox_height = models.FloatField(default=0)
+    key_frame = models.ForeignKey(
+        "Capture", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["camera", "started_at"])]
+
+    @property
+    def duration(self):
+        return self.ended_at - self.started_at
+
+    def __str__(self):
+        return f"Evento {self.id} - {self.camera.name} ({self.started_at:%Y-%m-%d %H:%M:%S})"
+
+
 class Capture(models.Model):
     camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="captures")
-    image = models.ImageField(upload_to="captures/")
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Indexado: el ClipWriter enlaza el clip buscando la captura por su imagen
+    image = models.ImageField(upload_to=capture_upload_to, max_length=200, db_index=True)
+    # Momento de la captura (el CaptureWriter puede insertarla algo después)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Tamaño del archivo en bytes (para las cuotas por cámara)
+    size_bytes = models.PositiveIntegerField(null=True, blank=True)
+    # Hash perceptual (dHash de 64 bits) para descartar capturas casi idénticas
+    phash = models.BigIntegerField(null=True, blank=True, db_index=True)
+    # Clip MP4 con pre-roll y post-roll del movimiento que disparó la captura
+    clip = models.FileField(upload_to=capture_upload_to, max_length=200, blank=True)
+    # Tamaño del clip en bytes: cuenta en la cuota de la cámara junto con la imagen
+    clip_bytes = models.PositiveIntegerField(null=True, blank=True)
+    event = models.ForeignKey(
+        MotionEvent, on_delete=models.SET_NULL, null=True, blank=True, related_name="captures"
+    )
+
+    class Meta:
+        # Galería paginada por (created_at, id), con o sin filtro de cámara
+        indexes = [
+            models.Index(fields=["camera", "created_at", "id"]),
+            models.Index(fields=["created_at", "id"]),
+        ]
+
+    @classmethod
+    def recent_hashes(cls, camera_id, since):
+        # Hashes de las últimas capturas de la cámara desde `since` (índice camera, created_at, id)
+        limit = getattr(settings, "CAPTURE_DEDUP_RECENT", 8)
+        return list(
+            cls.objects.filter(camera_id=camera_id, created_at__gte=since)
+            .order_by("-created_at", "-id")
+            .values_list("phash", flat=True)[:limit]
+        )
 
     def __str__(self):
         return f"Captura {self.id} - {self.camera.name} ({self.created_at:%Y-%m-%d %H:%M:%S})"
+
+
+class RecordingSegment(models.Model):
+    camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="segments")
+    file = models.FileField(max_length=200)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    size_bytes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        # Reproducción por instante y retención: rangos de (camera, started_at)
+        indexes = [models.Index(fields=["camera", "started_at"])]
+
+    @classmethod
+    def at(cls, camera_id, when):
+        # Segmento que contiene `when` (o None): el último que empezó antes
+        segment = (
+            cls.objects.filter(camera_id=camera_id, started_at__lte=when)
+            .order_by("-started_at")
+            .first()
+        )
+        if segment is not None and segment.ended_at >= when:
+            return segment
+        return None
+
+    def __str__(self):
+        return f"Segmento {self.id} - {self.camera.name} ({self.started_at:%Y-%m-%d %H:%M:%S})"
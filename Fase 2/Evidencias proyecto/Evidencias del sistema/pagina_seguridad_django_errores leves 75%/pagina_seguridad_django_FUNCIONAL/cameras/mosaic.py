@@ -0,0 +1,121 @@
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .hub import CameraHub, get_hub
+
+
+class MosaicHub(CameraHub):
+    # Mosaico de varias cámaras compuesto en el servidor: un único stream a
+    # tamaño fijo. Cada tile se reescala solo cuando su cámara entrega un
+    # frame nuevo, y el mosaico se codifica una vez por perfil (cache del
+    # CameraHub) sin importar cuántas pantallas lo miren.
+
+    def __init__(self, cameras, columns, size, fps, key=None):
+        super().__init__(f"mosaic-{'-'.join(str(c.id) for c in cameras)}", None)
+        self.key = key
+        # Etiqueta fija en la métrica de codificación: las series de un
+        # Histogram no se borran y cada combinación de cámaras sumaría una.
+        self.jpeg_cache.camera_id = "mosaic"
+        self.cameras = cameras
+        self.columns = columns
+        self.rows = math.ceil(len(cameras) / columns)
+        self.size = size
+        self.interval = 1 / fps
+        self.tile_size = (size[0] // columns, size[1] // self.rows)
+
+    def _tile_origin(self, index):
+        row, column = divmod(index, self.columns)
+        return column * self.tile_size[0], row * self.tile_size[1]
+
+    def _fit(self, frame):
+        # Reescala conservando la proporción y centra dentro del tile
+        tile_w, tile_h = self.tile_size
+        height, width = frame.shape[:2]
+        scale = min(tile_w / width, tile_h / height)
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        tile = np.zeros((tile_h, tile_w, 3), dtype=np.uint8)
+        x, y = (tile_w - size[0]) // 2, (tile_h - size[1]) // 2
+        tile[y:y + size[1], x:x + size[0]] = small
+        return tile
+
+    def _placeholder(self, camera):
+        tile = np.zeros((self.tile_size[1], self.tile_size[0], 3), dtype=np.uint8)
+        cv2.putText(tile, f"{camera.name}: sin senal", (10, self.tile_size[1] // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (160, 160, 160), 1, cv2.LINE_AA)
+        return tile
+
+    def _run(self):
+        # No ocupa un slot de decodificación: los hubs de cada cámara decodifican
+        hubs = [get_hub(camera) for camera in self.cameras]
+        for hub in hubs:
+            hub.subscribe()
+        canvas = np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8)
+        tile_seqs = [None] * len(hubs)
+        try:
+            next_at = time.monotonic()
+            while True:
+                changed = False
+                for index, (camera, hub) in enumerate(zip(self.cameras, hubs)):
+                    seq, frame = hub.latest()
+                    if seq == tile_seqs[index]:
+                        continue
+                    tile = self._fit(frame) if frame is not None else self._placeholder(camera)
+                    x, y = self._tile_origin(index)
+                    canvas[y:y + self.tile_size[1], x:x + self.tile_size[0]] = tile
+                    tile_seqs[index] = seq
+                    changed = True
+                if changed:
+                    # Copia: los codificadores pueden estar leyendo el frame anterior
+                    with self._cond:
+                        self.seq += 1
+                        self.frame = canvas.copy()
+                        self.frame_time = time.time()
+                        self.connected = True
+                        self._count_fps()
+                        self._notify()
+                next_at = max(next_at + self.interval, time.monotonic())
+                with self._cond:
+                    if self._cond.wait_for(self._should_stop, next_at - time.monotonic()):
+                        self._stopped()
+                        # Sin visores no se guarda el último mosaico ni sus JPEG
+                        self.frame = None
+                        break
+        except BaseException:
+            with self._cond:
+                self._stopped()
+            raise
+        finally:
+            for hub in hubs:
+                hub.unsubscribe()
+        release_mosaic(self)
+
+
+_mosaics = {}
+_mosaics_lock = threading.Lock()
+
+
+def get_mosaic(cameras, columns, size, fps):
+    # Las pantallas que piden el mismo mosaico comparten un hub; se retira del
+    # registro al detenerse (las combinaciones de ?cameras/cols/width/height
+    # las elige el cliente y no pueden acumularse).
+    key = (tuple(camera.id for camera in cameras), columns, size, fps)
+    with _mosaics_lock:
+        mosaic = _mosaics.get(key)
+        if mosaic is None:
+            mosaic = _mosaics[key] = MosaicHub(cameras, columns, size, fps, key)
+        return mosaic
+
+
+def release_mosaic(mosaic):
+    # Salvo que un visor lo haya vuelto a arrancar mientras se detenía
+    with _mosaics_lock:
+        if mosaic.running:
+            return
+        mosaic.jpeg_cache.clear()
+        if _mosaics.get(mosaic.key) is mosaic:
+            del _mosaics[mosaic.key]
@@ -0,0 +1,268 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .clips import ClipRecorder, clip_settings
+from .metrics import MOTION_SECONDS
+from .models import MotionConfig, MotionEvent
+from .phash import dhash, is_near_duplicate
+from .storage import capture_name
+from .writer import get_writer
+
+
+def build_mask(config, width, height):
+    # Máscara uint8 (255 = analizar) a la resolución de análisis; None si no hay polígonos
+    if not config.roi_polygons and not config.exclude_polygons:
+        return None
+    mask = np.full((height, width), 0 if config.roi_polygons else 255, dtype=np.uint8)
+    scale = np.array([width, height], dtype=np.float32)
+    for polygons, value in ((config.roi_polygons, 255), (config.exclude_polygons, 0)):
+        for polygon in polygons:
+            points = (np.array(polygon, dtype=np.float32) * scale).astype(np.int32)
+            cv2.fillPoly(mask, [points], value)
+    return mask
+
+
+class EventTracker:
+    # Agrupa las detecciones consecutivas en un MotionEvent: se abre con el
+    # primer movimiento, se extiende en memoria y se cierra tras `gap_seconds`
+    # sin movimiento o al llegar a MotionEvent.MAX_DURATION. La fila se guarda
+    # al abrir, cada `save_interval` y al cerrar.
+
+    save_interval = 10
+
+    def __init__(self, camera_id, gap_seconds):
+        self.camera_id = camera_id
+        self.gap_seconds = gap_seconds
+        self.event = None
+        self.key_area = 0
+        self.last_saved = 0
+
+    def update(self, area, bbox):
+        now = timezone.now()
+        if self.event is not None and (
+            (now - self.event.ended_at).total_seconds() > self.gap_seconds
+            or now - self.event.started_at >= MotionEvent.MAX_DURATION
+        ):
+            self.close()
+        x, y, w, h = bbox
+        if self.event is None:
+            self.event = MotionEvent.objects.create(
+                camera_id=self.camera_id,
+                started_at=now,
+                ended_at=now,
+                peak_area=area,
+                bbox_x=x,
+                bbox_y=y,
+                bbox_width=w,
+                bbox_height=h,
+            )
+            self.key_area = 0
+            self.last_saved = time.monotonic()
+            return self.event
+
+        event = self.event
+        event.ended_at = now
+        event.peak_area = max(event.peak_area, area)
+        x0 = min(event.bbox_x, x)
+        y0 = min(event.bbox_y, y)
+        x1 = max(event.bbox_x + event.bbox_width, x + w)
+        y1 = max(event.bbox_y + event.bbox_height, y + h)
+        event.bbox_x, event.bbox_y = x0, y0
+        event.bbox_width, event.bbox_height = x1 - x0, y1 - y0
+        if time.monotonic() - self.last_saved > self.save_interval:
+            self.save()
+        return event
+
+    def claim_key_frame(self, area):
+        # La captura con mayor área en movimiento representa al evento; el
+        # CaptureWriter enlaza el key_frame cuando la fila ya existe.
+        if self.event is not None and area > self.key_area:
+            self.key_area = area
+            return True
+        return False
+
+    def tick(self):
+        if self.event is not None and (timezone.now() - self.event.ended_at).total_seconds() > self.gap_seconds:
+            self.close()
+
+    def save(self):
+        # key_frame lo actualiza el CaptureWriter: no se sobrescribe aquí
+        self.event.save(update_fields=[
+            "ended_at", "peak_area", "bbox_x", "bbox_y", "bbox_width", "bbox_height",
+        ])
+        self.last_saved = time.monotonic()
+
+    def close(self):
+        if self.event is not None:
+            self.save()
+            self.event = None
+
+
+class MotionDetector:
+    # Detección de movimiento sobre los frames de un CameraHub. El análisis se
+    # hace en escala de grises sobre una copia reducida del frame, solo cada
+    # `frame_stride` frames y dentro de la máscara ROI/exclusión.
+
+    def __init__(self, camera_id, config=None):
+        self.camera_id = camera_id
+        self.events = None
+        self.pending_config = None
+        self._config_lock = threading.Lock()
+        self._apply_config(config or MotionConfig())
+        self.last_capture_time = 0
+        self.frames_seen = 0
+        # (time.time(), phash) de las capturas guardadas del evento en curso
+        self.recent_hashes = deque(maxlen=getattr(settings, "CAPTURE_DEDUP_RECENT", 8))
+        self.dedup_event_id = None
+        self.duplicates_skipped = 0
+        options = clip_settings()
+        self.clips = ClipRecorder(camera_id, options) if options["enabled"] else None
+
+    def configure(self, config):
+        # Puede llamarse desde otro hilo (run_detectors): la configuración
+        # nueva se aplica en el hilo del detector, al inicio del siguiente frame.
+        with self._config_lock:
+            self.pending_config = config
+
+    def _apply_pending_config(self):
+        with self._config_lock:
+            config, self.pending_config = self.pending_config, None
+        if config is not None:
+            self._apply_config(config)
+
+    def _apply_config(self, config):
+        self.config = config
+        if self.events is not None:
+            self.events.close()
+        self.events = EventTracker(self.camera_id, config.event_gap_seconds)
+        self.background = None
+        self.mask = None
+        self.analysis_size = None
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        analysis_width = min(self.config.analysis_width or width, width)
+        analysis_height = max(1, round(height * analysis_width / width))
+        self.analysis_size = (analysis_width, analysis_height)
+        self.min_area = self.config.min_area_ratio * analysis_width * analysis_height
+        # El desenfoque escala con la resolución de análisis (21x21 en ~1280 px)
+        self.blur = max(3, (analysis_width // 64) | 1)
+        self.mask = build_mask(self.config, analysis_width, analysis_height)
+
+    def detect(self, frame):
+        if self.analysis_size is None:
+            self._prepare(frame)
+        small = cv2.resize(frame, self.analysis_size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (self.blur, self.blur), 0)
+
+        if self.background is None:
+            self.background = gray.astype("float32")
+            return None
+
+        diff_frame = cv2.absdiff(cv2.convertScaleAbs(self.background), gray)
+        # Fondo adaptativo: absorbe cambios lentos de iluminación
+        cv2.accumulateWeighted(gray, self.background, 0.05)
+        thresh_frame = cv2.threshold(diff_frame, self.config.threshold, 255, cv2.THRESH_BINARY)[1]
+        if self.mask is not None:
+            thresh_frame = cv2.bitwise_and(thresh_frame, self.mask)
+        thresh_frame = cv2.dilate(thresh_frame, None, iterations=2)
+        cnts, _ = cv2.findContours(thresh_frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # Devuelve (área en movimiento como fracción, caja unión normalizada) o None
+        moving = [c for c in cnts if cv2.contourArea(c) >= self.min_area]
+        if not moving:
+            return None
+        width, height = self.analysis_size
+        area = sum(cv2.contourArea(c) for c in moving) / (width * height)
+        boxes = [cv2.boundingRect(c) for c in moving]
+        x0 = min(x for x, _, _, _ in boxes)
+        y0 = min(y for _, y, _, _ in boxes)
+        x1 = max(x + w for x, _, w, _ in boxes)
+        y1 = max(y + h for _, y, _, h in boxes)
+        return area, (x0 / width, y0 / height, (x1 - x0) / width, (y1 - y0) / height)
+
+    def process(self, hub, seq, frame):
+        self._apply_pending_config()
+        if self.clips is not None:
+            # El buffer de pre-roll se alimenta con todos los frames, no solo los analizados
+            self.clips.feed(hub, seq, frame)
+        self.frames_seen += 1
+        if self.frames_seen % max(1, self.config.frame_stride):
+            return
+        started = time.perf_counter()
+        motion = self.detect(frame)
+        MOTION_SECONDS.observe(time.perf_counter() - started, self.camera_id)
+        if motion is None:
+            self.events.tick()
+            return
+        area, bbox = motion
+        event = self.events.update(area, bbox)
+        now = time.time()
+        if now - self.last_capture_time <= self.config.cooldown_seconds:
+            return
+        self.last_capture_time = now
+
+        # Alguien quieto frente a la cámara: no se guarda otra captura igual.
+        # Solo se compara dentro del mismo evento y de una ventana corta; una
+        # intrusión nueva abre otro evento y su primera captura se guarda siempre.
+        phash = dhash(frame)
+        if event.id != self.dedup_event_id:
+            self.dedup_event_id = event.id
+            self.recent_hashes.clear()
+        else:
+            window = getattr(settings, "CAPTURE_DEDUP_WINDOW_SECONDS", 60)
+            recent = [value for at, value in self.recent_hashes if now - at <= window]
+            if is_near_duplicate(phash, recent, settings.CAPTURE_DEDUP_MAX_DISTANCE):
+                self.duplicates_skipped += 1
+                return
+        self.recent_hashes.appendleft((now, phash))
+
+        # JPEG de la cache del hub de este proceso, compartida con los clips.
+        # Los visores MJPEG están en el proceso web, con su propio hub: aquí
+        # la codificación no se comparte con ellos.
+        jpeg = hub.get_jpeg(seq, frame)
+        if jpeg is not None:
+            self.save_capture(jpeg, event, self.events.claim_key_frame(area), phash)
+
+    def save_capture(self, jpeg, event=None, key_frame=False, phash=None):
+        # El disco y la BD quedan fuera del bucle de frames (ver CaptureWriter)
+        name = capture_name(self.camera_id, "auto_cap", timezone.now())
+        submitted = get_writer().submit(
+            self.camera_id,
+            name,
+            jpeg,
+            event_id=event.id if event else None,
+            key_frame_of=event.id if event and key_frame else None,
+            phash=phash,
+        )
+        if submitted and self.clips is not None:
+            self.clips.trigger(name)
+
+    def run(self, hub):
+        # Consume frames del hub hasta que este se detiene
+        seq = 0
+        try:
+            while hub.running:
+                seq, frame = hub.wait_frame(seq, timeout=1)
+                try:
+                    if frame is None:
+                        self._apply_pending_config()
+                        self.events.tick()
+                    else:
+                        self.process(hub, seq, frame)
+                except Exception as e:
+                    print(f"Error en detección de movimiento: {e}")
+        finally:
+            if self.clips is not None:
+                self.clips.finish()
+            self.events.close()
+            connection.close()
+
@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+_MASK = (1 << 64) - 1
+# Pesos de cada bit para empaquetar los 64 bits del hash en un entero
+_BITS = 1 << np.arange(63, -1, -1, dtype=np.uint64)
+
+
+def dhash(image):
+    # Hash perceptual por diferencias (dHash) de 64 bits: se reduce a 9x8 en
+    # gris y cada bit indica si un píxel es más claro que su vecino derecho.
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int(np.sum(_BITS[bits], dtype=np.uint64))
+    # Se guarda en un BigIntegerField (con signo)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def dhash_jpeg(data):
+    # Decodifica el JPEG ya reducido a 1/8 y en gris: basta para el hash
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return None
+    return dhash(image)
+
+
+def hamming(a, b):
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def is_near_duplicate(value, recent, max_distance):
+    return any(other is not None and hamming(value, other) <= max_distance for other in recent)
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import cv2
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from .models import RecordingSegment
+from .storage import recording_name
+
+
+def recording_settings():
+    defaults = {
+        "segment_seconds": 60,
+        "max_segment_bytes": 64 * 1024 * 1024,
+        "fps": 10,
+        "max_width": 1280,
+        "fourcc": "mp4v",
+    }
+    defaults.update(getattr(settings, "CAMERA_RECORDING", {}))
+    return defaults
+
+
+class SegmentRecorder:
+    # Grabación continua de una cámara en segmentos MP4 de duración fija.
+    # Consume los frames del mismo CameraHub que el detector y los visores:
+    # no abre otra conexión RTSP. Cada segmento cerrado se registra en
+    # RecordingSegment (cámara, inicio, fin, bytes).
+
+    def __init__(self, camera_id, options=None):
+        self.camera_id = camera_id
+        self.options = options or recording_settings()
+        self.interval = 1 / max(1, self.options["fps"])
+        self.writer = None
+        self.size = None
+        self.name = None
+        self.tmp_path = None
+        self.started = 0
+        self.frames_written = 0
+        self.last_size_check = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        # El hilo de grabación cierra y registra el segmento en curso al salir
+        self._stop.set()
+
+    def _resize(self, frame):
+        height, width = frame.shape[:2]
+        max_width = self.options["max_width"]
+        if max_width and width > max_width:
+            frame = cv2.resize(frame, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _open(self, frame, now):
+        height, width = frame.shape[:2]
+        self.size = (width, height)
+        self.started = now
+        self.frames_written = 0
+        self.name = recording_name(self.camera_id, datetime.fromtimestamp(now, dt_timezone.utc))
+        path = settings.MEDIA_ROOT / self.name
+        os.makedirs(path.parent, exist_ok=True)
+        self.tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+        fourcc = cv2.VideoWriter_fourcc(*self.options["fourcc"])
+        self.writer = cv2.VideoWriter(str(self.tmp_path), fourcc, self.options["fps"], self.size)
+        if not self.writer.isOpened():
+            self.writer = None
+            raise OSError(f"cv2.VideoWriter no pudo abrir {self.tmp_path}")
+
+    def write(self, frame, now):
+        frame = self._resize(frame)
+        if self.writer is not None and (
+            frame.shape[1] != self.size[0] or frame.shape[0] != self.size[1]
+        ):
+            # Cambió la resolución de la cámara: segmento nuevo
+            self.rotate()
+        if self.writer is not None and now - self.started - self.frames_written * self.interval > 5:
+            # La cámara dejó de enviar frames un rato: el hueco queda entre segmentos
+            self.rotate()
+        if self.writer is None:
+            self._open(frame, now)
+
+        # Frecuencia constante: si la cámara entrega menos fps se repite el
+        # último frame, para que la posición en el archivo sea la hora real.
+        due = int((now - self.started) / self.interval) + 1
+        while self.frames_written < due:
+            self.writer.write(frame)
+            self.frames_written += 1
+
+        if now - self.started >= self.options["segment_seconds"] or self._too_big(now):
+            self.rotate()
+
+    def _too_big(self, now):
+        if now - self.last_size_check < 1:
+            return False
+        self.last_size_check = now
+        try:
+            return self.tmp_path.stat().st_size >= self.options["max_segment_bytes"]
+        except FileNotFoundError:
+            return False
+
+    def rotate(self):
+        # Cierra el segmento actual y lo registra; el siguiente frame abre otro
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.writer = None
+        ended = self.started + self.frames_written * self.interval
+        path = settings.MEDIA_ROOT / self.name
+        os.replace(self.tmp_path, path)
+        for attempt in range(1, 6):
+            try:
+                RecordingSegment.objects.create(
+                    camera_id=self.camera_id,
+                    file=self.name,
+                    started_at=datetime.fromtimestamp(self.started, dt_timezone.utc),
+                    ended_at=datetime.fromtimestamp(ended, dt_timezone.utc),
+                    size_bytes=path.stat().st_size,
+                )
+                return
+            except OperationalError as e:
+                if attempt == 5:
+                    # Sin fila la retención no lo vería nunca: se descarta el segmento
+                    path.unlink(missing_ok=True)
+                    print(f"Segmento {self.name} descartado: no se pudo registrar ({e})")
+                    return
+                time.sleep(0.2 * attempt)
+
+    def run(self, hub):
+        # Consume frames del hub hasta que este se detiene
+        seq = 0
+        last_written = 0
+        try:
+            while hub.running and not self._stop.is_set():
+                seq, frame = hub.wait_frame(seq, timeout=1)
+                if frame is None:
+                    continue
+                now = time.time()
+                if now - last_written < self.interval:
+                    continue
+                last_written = now
+                try:
+                    self.write(frame, now)
+                except (OSError, OperationalError, cv2.error) as e:
+                    print(f"Error en grabación de la cámara {self.camera_id}: {e}")
+                    time.sleep(1)
+        finally:
+            try:
+                self.rotate()
+            except (OSError, OperationalError) as e:
+                print(f"Error al cerrar segmento de la cámara {self.camera_id}: {e}")
+            connection.close()
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Capture
+from .thumbnails import delete_thumbnails
+
+
+@receiver(post_delete, sender=Capture)
+def remove_capture_thumbnails(sender, instance, **kwargs):
+    delete_thumbnails(instance.id)
@@ -0,0 +1,31 @@
+import os
+
+from django.utils import timezone
+
+CAPTURES_ROOT = "captures"
+RECORDINGS_ROOT = "recordings"
+
+
+def capture_dir(camera_id, when=None, root=CAPTURES_ROOT):
+    # captures/<camera_id>/<AAAA>/<MM>/<DD>/ : ningún directorio crece sin
+    # límite y borrar o respaldar un día o una cámara es mover una carpeta.
+    when = timezone.localtime(when or timezone.now())
+    return f"{root}/{camera_id}/{when:%Y/%m/%d}"
+
+
+def capture_name(camera_id, prefix="capture", when=None, ext="jpg"):
+    # Ruta relativa a MEDIA_ROOT (lo que se guarda en Capture.image)
+    when = timezone.localtime(when or timezone.now())
+    return f"{capture_dir(camera_id, when)}/{prefix}_{camera_id}_{when:%H%M%S_%f}.{ext}"
+
+
+def recording_name(camera_id, when=None):
+    # Segmentos de grabación continua: misma estructura, bajo recordings/
+    when = timezone.localtime(when or timezone.now())
+    return f"{capture_dir(camera_id, when, RECORDINGS_ROOT)}/seg_{camera_id}_{when:%H%M%S_%f}.mp4"
+
+
+def capture_upload_to(instance, filename):
+    # upload_to de Capture.image (p. ej. subidas desde el admin)
+    ext = os.path.splitext(filename)[1].lstrip(".").lower() or "jpg"
+    return capture_name(instance.camera_id, "upload", instance.created_at, ext)
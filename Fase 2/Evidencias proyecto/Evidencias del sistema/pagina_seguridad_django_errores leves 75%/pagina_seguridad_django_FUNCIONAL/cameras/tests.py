@@ -0,0 +1,173 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Camera, Capture, SecurityCode
+from .tokens import check_token, is_signed, issue_token, revoke_token
+
+
+class EnforceRetentionTests(TestCase):
+    def setUp(self):
+        self.media = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, CAPTURE_RETENTION={})
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.camera = Camera.objects.create(
+            name="Entrada",
+            rtsp_url="rtsp://camara.local/stream",
+            retention_days=30,
+            downsample_after_days=7,
+            max_capture_bytes=250_000,
+        )
+        now = timezone.now()
+        # 4 vencidas en la misma hora (edad máxima; también caerían en el submuestreo)
+        old = (now - timedelta(days=40)).replace(minute=0, second=0, microsecond=0)
+        for i in range(4):
+            self.capture(f"old{i}", old + timedelta(minutes=i))
+        # 3 en la misma hora pasados los días de submuestreo: sobran 2
+        week = (now - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+        for i in range(3):
+            self.capture(f"week{i}", week + timedelta(minutes=i))
+        # 3 recientes con size_bytes ya calculado
+        for i in range(3):
+            self.capture(f"new{i}", now - timedelta(hours=3 - i), size_bytes=100_000)
+
+    def capture(self, name, created_at, size_bytes=None):
+        image = f"captures/{name}.jpg"
+        path = self.media / image
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 100_000)
+        return Capture.objects.create(
+            camera=self.camera, image=image, created_at=created_at, size_bytes=size_bytes
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command("enforce_retention", *args, "--pause", "0", stdout=out)
+        summary = out.getvalue().strip().splitlines()[-1]
+        rows, megabytes = re.search(r"(\d+) capturas y \d+ segmentos; ([\d.]+) MB", summary).groups()
+        return int(rows), float(megabytes)
+
+    def test_dry_run_matches_real_run_and_changes_nothing(self):
+        before = list(Capture.objects.order_by("id").values_list("id", "size_bytes"))
+
+        dry = self.run_command("--dry-run")
+        self.assertEqual(list(Capture.objects.order_by("id").values_list("id", "size_bytes")), before)
+        self.assertEqual(len(list(self.media.rglob("*.jpg"))), 10)
+
+        real = self.run_command()
+        # Edad máxima 4 + submuestreo 2 + cuota 2 (quedan 400 KB para 250 KB)
+        self.assertEqual(dry, (8, 0.8))
+        self.assertEqual(real, dry)
+        self.assertEqual(Capture.objects.count(), 2)
+        self.assertEqual(len(list(self.media.rglob("*.jpg"))), 2)
+
+    def test_quota_counts_clips(self):
+        # Sin edad máxima ni submuestreo: solo la cuota, con un clip de 300 KB
+        self.camera.retention_days = self.camera.downsample_after_days = None
+        self.camera.max_capture_bytes = 1_200_000
+        self.camera.save()
+        newest = Capture.objects.latest("created_at")
+        (self.media / "captures/clip.mp4").write_bytes(b"\0" * 300_000)
+        newest.clip = "captures/clip.mp4"
+        newest.save()
+
+        # 10 imágenes (1 MB) + clip (0.3 MB) = 1.3 MB: sobra la más antigua
+        self.assertEqual(self.run_command("--dry-run"), (1, 0.1))
+        self.assertIsNone(Capture.objects.get(pk=newest.pk).clip_bytes)
+        self.assertEqual(self.run_command(), (1, 0.1))
+        self.assertEqual(Capture.objects.get(pk=newest.pk).clip_bytes, 300_000)
+
+    def test_sweeps_stale_tmp_files(self):
+        stale = self.media / "recordings/1/2026/01/01/seg_1_000000_000000.tmp.mp4"
+        fresh = self.media / "recordings/1/2026/01/01/seg_1_010000_000000.tmp.mp4"
+        for path in (stale, fresh):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"\0" * 1000)
+        two_hours_ago = time.time() - 7200
+        os.utime(stale, (two_hours_ago, two_hours_ago))
+
+        self.run_command("--dry-run")
+        self.assertTrue(stale.exists())
+        self.run_command()
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
+
+    def test_counts_each_capture_once(self):
+        self.camera.max_capture_bytes = None
+        self.camera.save()
+        rows, _ = self.run_command("--dry-run")
+        self.assertEqual(rows, 6)
+        self.assertEqual(self.run_command()[0], 6)
+
+
+@override_settings(
+    CAMERA_TOKEN_MODE="signed",
+    CAMERA_TOKEN_AUDIT=False,
+    CAMERA_TOKEN_REVOCATION_CACHE="tokens",
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tokens-tests"},
+    },
+)
+class StreamTokenTests(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(name="Patio", rtsp_url="rtsp://camara.local/patio")
+        self.other = Camera.objects.create(name="Bodega", rtsp_url="rtsp://camara.local/bodega")
+
+    def test_issue_and_check_without_queries(self):
+        token, expires_at = issue_token(self.camera, lifetime_seconds=60)
+        self.assertTrue(is_signed(token))
+        self.assertFalse(SecurityCode.objects.exists())
+        with self.assertNumQueries(0):
+            checked, error = check_token(self.camera.id, token)
+        self.assertIsNone(error)
+        self.assertEqual(int(checked.timestamp()), int(expires_at.timestamp()))
+        # El id de cámara llega como texto desde la query string
+        self.assertIsNone(check_token(str(self.camera.id), token)[1])
+
+    def test_other_camera_is_rejected(self):
+        token, _ = issue_token(self.camera)
+        self.assertEqual(check_token(self.other.id, token), (None, "Token inválido."))
+
+    def test_tampered_token_is_rejected(self):
+        token, _ = issue_token(self.camera)
+        data, signature = token.rsplit(":", 1)
+        forged = signature[:-1] + ("A" if signature[-1] != "A" else "B")
+        self.assertEqual(check_token(self.camera.id, f"{data}:{forged}"), (None, "Token inválido."))
+
+    def test_expired_token_is_rejected(self):
+        token, expires_at = issue_token(self.camera, lifetime_seconds=60)
+        with mock.patch("cameras.tokens.time.time", return_value=expires_at.timestamp() + 1):
+            self.assertEqual(check_token(self.camera.id, token), (None, "Token expirado o ya usado."))
+
+    def test_revoke(self):
+        token, _ = issue_token(self.camera)
+        other_token, _ = issue_token(self.camera)
+        self.assertFalse(revoke_token(self.other.id, token))
+        self.assertTrue(revoke_token(self.camera.id, token))
+        self.assertEqual(check_token(self.camera.id, token), (None, "Token revocado."))
+        self.assertIsNone(check_token(self.camera.id, other_token)[1])
+        # Ya revocado: no se puede volver a revocar
+        self.assertFalse(revoke_token(self.camera.id, token))
+
+    @override_settings(CAMERA_TOKEN_MODE="db")
+    def test_db_tokens(self):
+        token, _ = issue_token(self.camera)
+        self.assertFalse(is_signed(token))
+        self.assertIsNone(check_token(self.camera.id, token)[1])
+        self.assertEqual(check_token(self.other.id, token), (None, "Token inválido."))
+        self.assertTrue(revoke_token(self.camera.id, token))
+        self.assertEqual(check_token(self.camera.id, token), (None, "Token expirado o ya usado."))
@@ -0,0 +1,56 @@
+import io
+import os
+import threading
+
+from django.conf import settings
+from PIL import Image
+
+
+def thumbnail_sizes():
+    # Nombre de la versión -> ancho máximo en píxeles
+    return getattr(settings, "CAPTURE_THUMBNAIL_SIZES", {"small": 320, "medium": 640})
+
+
+def thumbnail_path(capture_id, size):
+    # Cacheadas en disco por id de captura y tamaño, repartidas en subcarpetas
+    # de 1000 para no tener un único directorio enorme.
+    return settings.MEDIA_ROOT / "thumbs" / size / str(capture_id // 1000) / f"{capture_id}.jpg"
+
+
+def render_thumbnail(source, size):
+    # `source` es una ruta o un archivo en memoria con el JPEG original
+    width = thumbnail_sizes()[size]
+    with Image.open(source) as img:
+        # draft() decodifica el JPEG ya reducido (escalado DCT): mucho más
+        # barato que decodificar a resolución completa y luego achicar.
+        img.draft("RGB", (width, width))
+        img = img.convert("RGB")
+        img.thumbnail((width, width * 4))
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=75, optimize=True)
+    return out.getvalue()
+
+
+def save_thumbnail(capture_id, size, source):
+    path = thumbnail_path(capture_id, size)
+    os.makedirs(path.parent, exist_ok=True)
+    data = render_thumbnail(source, size)
+    # Escritura atómica: un lector concurrente nunca ve un archivo a medias
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_thumbnail(capture, size):
+    # Genera la versión la primera vez que se pide
+    path = thumbnail_path(capture.id, size)
+    if not path.exists():
+        save_thumbnail(capture.id, size, capture.image.path)
+    return path
+
+
+def delete_thumbnails(capture_id):
+    for size in thumbnail_sizes():
+        thumbnail_path(capture_id, size).unlink(missing_ok=True)
@@ -0,0 +1,88 @@
+import secrets
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import SecurityCode
+
+SALT = "cameras.stream-token"
+
+
+def _revoked():
+    # Tokens revocados antes de expirar, en una cache común a todos los
+    # procesos; cada entrada caduca junto con su token.
+    return caches[getattr(settings, "CAMERA_TOKEN_REVOCATION_CACHE", "default")]
+
+
+def _revoked_key(token):
+    return f"cameras:revoked:{token_id(token)}"
+
+
+def is_signed(token):
+    # Los tokens firmados son "datos:firma"; los de SecurityCode no llevan ":"
+    return ":" in token
+
+
+def token_id(token):
+    # La firma identifica al token (auditoría y lista de revocados)
+    return token.rsplit(":", 1)[1]
+
+
+def issue_token(camera, lifetime_seconds=300):
+    # Devuelve (token, expires_at) según CAMERA_TOKEN_MODE
+    if getattr(settings, "CAMERA_TOKEN_MODE", "signed") != "signed":
+        code = SecurityCode.create_for_camera(camera, lifetime_seconds=lifetime_seconds)
+        return code.token, code.expires_at
+
+    expires_at = timezone.now() + timedelta(seconds=lifetime_seconds)
+    token = signing.dumps(
+        [camera.id, int(expires_at.timestamp()), secrets.token_urlsafe(6)],
+        salt=SALT,
+    )
+    if getattr(settings, "CAMERA_TOKEN_AUDIT", False):
+        # Solo registro: la validación nunca consulta esta tabla
+        SecurityCode.objects.create(camera=camera, token=token_id(token), expires_at=expires_at)
+    return token, expires_at
+
+
+def check_token(camera_id, token):
+    # Devuelve (expires_at, None) si el token permite ver la cámara, o
+    # (None, mensaje de error). Los tokens firmados no tocan la BD.
+    if not is_signed(token):
+        try:
+            code = SecurityCode.objects.get(camera_id=camera_id, token=token)
+        except (SecurityCode.DoesNotExist, ValueError):
+            return None, "Token inválido."
+        if not code.is_valid():
+            return None, "Token expirado o ya usado."
+        return code.expires_at, None
+
+    try:
+        token_camera, expires, _ = signing.loads(token, salt=SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None, "Token inválido."
+    if str(token_camera) != str(camera_id):
+        return None, "Token inválido."
+    if expires <= time.time():
+        return None, "Token expirado o ya usado."
+    if _revoked().get(_revoked_key(token)):
+        return None, "Token revocado."
+    return datetime.fromtimestamp(expires, dt_timezone.utc), None
+
+
+def revoke_token(camera_id, token):
+    expires_at, error = check_token(camera_id, token)
+    if error:
+        return False
+    if not is_signed(token):
+        SecurityCode.objects.filter(camera_id=camera_id, token=token).update(used=True)
+        return True
+
+    timeout = max(1, int(expires_at.timestamp() - time.time()) + 1)
+    _revoked().set(_revoked_key(token), True, timeout)
+    SecurityCode.objects.filter(camera_id=camera_id, token=token_id(token)).update(used=True)
+    return True
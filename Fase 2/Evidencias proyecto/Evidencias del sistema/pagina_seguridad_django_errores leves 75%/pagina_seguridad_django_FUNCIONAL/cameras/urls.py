@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -11,9 +12,20 @@ urlpatterns = [
     path("home/", views.camera_list, name="camera_list"),
     path("add_camera/", views.add_camera, name="add_camera"),
     path("generate_qr/<int:camera_id>/", views.generate_qr_for_camera, name="generate_qr"),
+    path("qr/access.<str:fmt>", views.access_qr, name="access_qr"),
+    path("qr/revoke/", views.revoke_access, name="revoke_access"),
     path("stream/", views.camera_stream, name="camera_stream"),
-    path("mjpeg_feed/", views.camera_mjpeg_feed, name="camera_mjpeg_feed"),
+    path(
+        "mjpeg_feed/",
+        views.camera_mjpeg_feed_async if settings.CAMERA_ASYNC_STREAMING else views.camera_mjpeg_feed,
+        name="camera_mjpeg_feed",
+    ),
+    path("mosaic/", views.mosaic_feed, name="mosaic_feed"),
     path("capture/<int:camera_id>/", views.capture_frame, name="capture_frame"),
+    path("snapshot/<int:camera_id>.jpg", views.camera_snapshot, name="camera_snapshot"),
     path("delete/<int:camera_id>/", views.delete_camera, name="delete_camera"),
     path("captures/", views.captures_gallery, name="captures_gallery"),
+    path("captures/<int:capture_id>/thumb/<str:size>.jpg", views.capture_thumbnail, name="capture_thumbnail"),
+    path("events/", views.motion_events, name="motion_events"),
+    path("recordings/<int:camera_id>/", views.recording_playback, name="recording_playback"),
 ]
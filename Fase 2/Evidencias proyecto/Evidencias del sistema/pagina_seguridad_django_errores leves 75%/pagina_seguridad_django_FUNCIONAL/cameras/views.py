@@ -1,19 +1,51 @@
+import asyncio
 import io
+import math
 import os
 import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlencode
 
-import cv2
 import qrcode
+import qrcode.image.svg
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import HttpResponse, StreamingHttpResponse, HttpResponseForbidden
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import OuterRef, Subquery
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
-
-from .models import Camera, SecurityCode, Capture
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from . import metrics
+from .encoding import DEFAULT_PROFILE, StreamProfile, resolve_profile
+from .hub import get_hub
+from .models import Camera, Capture, MotionEvent, RecordingSegment
+from .mosaic import get_mosaic
+from .phash import dhash, is_near_duplicate
+from .storage import capture_name
+from .tokens import check_token, is_signed, issue_token, revoke_token
+from .thumbnails import get_thumbnail, thumbnail_sizes
+
+# Parámetros de perfil de stream que camera_stream reenvía al feed MJPEG
+PROFILE_PARAMS = ("profile", "max_width", "fps", "quality")
+EVENTS_PAGE_SIZE = 200
+MAX_CAPTURES_PAGE_SIZE = 200
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
 
 def login_view(request):
@@ -59,12 +91,15 @@ def logout_view(request):
 
 @login_required
 def camera_list(request):
-    cameras = Camera.objects.all()
-    # adjuntar última captura (si existe) a cada cámara
+    # adjuntar última captura (si existe) a cada cámara, en una sola consulta
+    # (subconsulta por cámara resuelta con el índice camera, created_at)
+    last_capture = Capture.objects.filter(camera=OuterRef("pk")).order_by("-created_at")
+    cameras = Camera.objects.annotate(last_capture_id=Subquery(last_capture.values("pk")[:1]))
     for cam in cameras:
-        from .models import Capture
-        last = Capture.objects.filter(camera=cam).order_by("-created_at").first()
-        cam.last_capture = last.image.url if last else ""
+        cam.last_capture = (
+            reverse("cameras:capture_thumbnail", args=[cam.last_capture_id, "medium"])
+            if cam.last_capture_id else ""
+        )
     return render(request, "cameras/home.html", {"cameras": cameras})
 
 
@@ -92,104 +127,168 @@ def add_camera(request):
     return render(request, "cameras/add_camera.html", {"camera": camera, "error": error})
 
 
+def access_stream_url(request, camera_id, token):
+    # El QR se abre casi siempre desde un teléfono: perfil liviano por defecto
+    params = {"camera": camera_id, "token": token, "profile": settings.CAMERA_QR_PROFILE}
+    return request.build_absolute_uri(reverse("cameras:camera_stream") + "?" + urlencode(params))
+
+
 @login_required
 def generate_qr_for_camera(request, camera_id):
     camera = get_object_or_404(Camera, pk=camera_id)
     lifetime = int(request.GET.get("lifetime_seconds", 300))
-    code = SecurityCode.create_for_camera(camera, lifetime_seconds=lifetime)
+    token, expires_at = issue_token(camera, lifetime_seconds=lifetime)
+    access = urlencode({"camera": camera.id, "token": token})
 
-    stream_url = request.build_absolute_uri(
-        reverse("cameras:camera_stream") + f"?camera={camera.id}&token={code.token}"
+    return render(
+        request,
+        "cameras/qr_access.html",
+        {
+            "camera": camera,
+            "token": token,
+            "qr_url": reverse("cameras:access_qr", args=["png"]) + "?" + access,
+            "stream_url": access_stream_url(request, camera.id, token),
+            "expires_at": expires_at,
+        },
     )
 
+
+@login_required
+def access_qr(request, fmt):
+    # Imagen del QR generada en memoria: nada se escribe en disco
+    if fmt not in ("png", "svg"):
+        raise Http404("Formato de QR desconocido.")
+    camera_id = request.GET.get("camera")
+    token = request.GET.get("token")
+    if not camera_id or not token:
+        return HttpResponseForbidden("Falta cámara o token.")
+    expires_at, error = check_token(camera_id, token)
+    if error:
+        raise Http404(error)
+    remaining = int((expires_at - timezone.now()).total_seconds())
+    if remaining <= 0:
+        raise Http404("Token expirado o ya usado.")
+
     qr = qrcode.QRCode(box_size=8, border=2)
-    qr.add_data(stream_url)
+    qr.add_data(access_stream_url(request, camera_id, token))
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+        content_type = "image/svg+xml"
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer)
+        content_type = "image/png"
 
-    qr_dir = settings.MEDIA_ROOT / "access_qr"
-    os.makedirs(qr_dir, exist_ok=True)
-    filename = f"access_{camera.id}_{code.token}.png"
-    file_path = qr_dir / filename
-    img.save(file_path)
+    # La imagen de un token no cambia: el navegador la guarda hasta que expira
+    response = HttpResponse(buffer.getvalue(), content_type=content_type)
+    response["Cache-Control"] = f"private, max-age={remaining}, immutable"
+    response["Expires"] = http_date(expires_at.timestamp())
+    return response
 
-    qr_url = f"{settings.MEDIA_URL}access_qr/{filename}"
 
-    return render(
-        request,
-        "cameras/qr_access.html",
-        {
-            "camera": camera,
-            "qr_url": qr_url,
-            "stream_url": stream_url,
-            "expires_at": code.expires_at,
-        },
+@login_required
+def revoke_access(request):
+    if request.method != "POST":
+        return HttpResponseBadRequest("Usa POST para revocar un acceso.")
+    revoke_token(request.POST.get("camera", ""), request.POST.get("token", ""))
+    return redirect("cameras:camera_list")
+
+
+def gen_camera_frames(hub, profile=DEFAULT_PROFILE):
+    hub.subscribe()
+    hub.add_viewer(1)
+    try:
+        seq = last_seq = 0
+        while True:
+            seq, frame = hub.wait_frame(seq, timeout=5)
+            if frame is None:
+                if not hub.running:
+                    break
+                continue
+            if last_seq and not profile.fps:
+                # Sin límite de fps, un salto de seq es un frame que el visor no alcanzó
+                hub.count_dropped(seq - last_seq - 1)
+            last_seq = seq
+            frame_bytes = hub.get_jpeg(seq, frame, profile)
+            if frame_bytes is None:
+                continue
+            sent_at = time.monotonic()
+            yield mjpeg_part(frame_bytes)
+            delay = frame_delay(profile, sent_at)
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        hub.add_viewer(-1)
+        hub.unsubscribe()
+
+
+async def agen_camera_frames(hub, profile=DEFAULT_PROFILE):
+    # Versión asíncrona: cada visor espera en el loop, sin ocupar un hilo
+    hub.subscribe()
+    hub.add_viewer(1)
+    try:
+        seq = last_seq = 0
+        while True:
+            seq, frame = await hub.wait_frame_async(seq, timeout=5)
+            if frame is None:
+                if not hub.running:
+                    break
+                continue
+            if last_seq and not profile.fps:
+                # Sin límite de fps, un salto de seq es un frame que el visor no alcanzó
+                hub.count_dropped(seq - last_seq - 1)
+            last_seq = seq
+            frame_bytes = await hub.get_jpeg_async(seq, frame, profile)
+            if frame_bytes is None:
+                continue
+            sent_at = time.monotonic()
+            yield mjpeg_part(frame_bytes)
+            delay = frame_delay(profile, sent_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+    finally:
+        hub.add_viewer(-1)
+        hub.unsubscribe()
+
+
+def frame_delay(profile, sent_at):
+    # Espera hasta el próximo envío según los fps del perfil; al despertar se
+    # toma el frame más reciente, así visores del mismo perfil comparten JPEG.
+    if not profile.fps:
+        return 0
+    return 1 / profile.fps - (time.monotonic() - sent_at)
+
+
+def mjpeg_part(frame_bytes):
+    return (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
     )
 
 
-def gen_camera_frames(rtsp_url, camera_id=None):
-    cap = cv2.VideoCapture(rtsp_url)
-    if not cap.isOpened():
-        return
-    
-    static_back = None
-    last_capture_time = 0
-
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-        
-        # Detección de movimiento básica
-        if camera_id:
-            try:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                gray = cv2.GaussianBlur(gray, (21, 21), 0)
-                
-                if static_back is None:
-                    static_back = gray
-                else:
-                    diff_frame = cv2.absdiff(static_back, gray)
-                    thresh_frame = cv2.threshold(diff_frame, 30, 255, cv2.THRESH_BINARY)[1]
-                    thresh_frame = cv2.dilate(thresh_frame, None, iterations=2)
-                    cnts, _ = cv2.findContours(thresh_frame.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    
-                    motion = False
-                    for contour in cnts:
-                        if cv2.contourArea(contour) < 5000: # Sensibilidad
-                            continue
-                        motion = True
-                        break
-                    
-                    if motion:
-                        now = time.time()
-                        if now - last_capture_time > 5: # 5 segundos de espera
-                            last_capture_time = now
-                            # Guardar captura
-                            fname = f"auto_cap_{camera_id}_{int(now)}.jpg"
-                            cdir = settings.MEDIA_ROOT / "captures"
-                            os.makedirs(cdir, exist_ok=True)
-                            fpath = cdir / fname
-                            
-                            # Guardar archivo
-                            _, saved_img = cv2.imencode(".jpg", frame)
-                            with open(fpath, "wb") as f:
-                                f.write(saved_img.tobytes())
-                            
-                            # Registrar en BD
-                            Capture.objects.create(camera_id=camera_id, image=f"captures/{fname}")
-            except Exception as e:
-                print(f"Error en detección de movimiento: {e}")
-
-        ok, jpeg = cv2.imencode(".jpg", frame)
-        if not ok:
-            continue
-        frame_bytes = jpeg.tobytes()
-        yield (
-            b"--frame\r\n"
-            b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
-        )
-    cap.release()
+def token_error(camera, token):
+    # Mensaje de error si el token no permite ver la cámara, None si es válido
+    return check_token(camera.id, token)[1]
+
+
+async def token_error_async(camera, token):
+    # Los tokens firmados no tocan la BD, pero la lista de revocados está en
+    # una cache que puede ser de disco o de red: fuera del loop en ambos casos.
+    # Solo los de SecurityCode necesitan el hilo compartido del ORM.
+    return await sync_to_async(token_error, thread_sensitive=not is_signed(token))(camera, token)
+
+
+async def get_camera_async(camera_id):
+    try:
+        return await Camera.objects.aget(pk=camera_id)
+    except (Camera.DoesNotExist, ValueError):
+        raise Http404("Cámara no encontrada.")
+
+
+async def is_authenticated(request):
+    # request.user es perezoso y consulta la sesión: no puede evaluarse en el loop
+    return await sync_to_async(lambda: request.user.is_authenticated)()
 
 
 @login_required
@@ -199,19 +298,45 @@ def camera_mjpeg_feed(request):
     if not camera_id:
         return HttpResponseForbidden("Falta cámara.")
     camera = get_object_or_404(Camera, pk=camera_id)
+    try:
+        profile = resolve_profile(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest("Perfil de stream inválido.")
 
     # Si viene token, validarlo
     if token:
-        try:
-            code = SecurityCode.objects.get(camera=camera, token=token)
-        except SecurityCode.DoesNotExist:
-            return HttpResponseForbidden("Token inválido.")
-        if not code.is_valid():
-            return HttpResponseForbidden("Token expirado o ya usado.")
+        error = token_error(camera, token)
+        if error:
+            return HttpResponseForbidden(error)
     
     # Si no viene token, asumimos acceso concedido por @login_required
     return StreamingHttpResponse(
-        gen_camera_frames(camera.rtsp_url, camera_id=camera.id),
+        gen_camera_frames(get_hub(camera), profile),
+        content_type="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
+async def camera_mjpeg_feed_async(request):
+    # Variante de camera_mjpeg_feed para ASGI (ver mysite/asgi.py)
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    camera_id = request.GET.get("camera")
+    token = request.GET.get("token")
+    if not camera_id:
+        return HttpResponseForbidden("Falta cámara.")
+    camera = await get_camera_async(camera_id)
+    try:
+        profile = resolve_profile(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest("Perfil de stream inválido.")
+
+    if token:
+        error = await token_error_async(camera, token)
+        if error:
+            return HttpResponseForbidden(error)
+
+    return StreamingHttpResponse(
+        agen_camera_frames(get_hub(camera), profile),
         content_type="multipart/x-mixed-replace; boundary=frame",
     )
 
@@ -223,14 +348,14 @@ def camera_stream(request):
     if not camera_id or not token:
         return HttpResponseForbidden("Falta cámara o token.")
     camera = get_object_or_404(Camera, pk=camera_id)
-    try:
-        code = SecurityCode.objects.get(camera=camera, token=token)
-    except SecurityCode.DoesNotExist:
-        return HttpResponseForbidden("Token inválido.")
-    if not code.is_valid():
-        return HttpResponseForbidden("Token expirado o ya usado.")
+    error = token_error(camera, token)
+    if error:
+        return HttpResponseForbidden(error)
+    # El perfil pedido (profile, max_width, fps, quality) se pasa al feed MJPEG
+    params = {"camera": camera.id, "token": token}
+    params.update({k: v for k, v in request.GET.items() if k in PROFILE_PARAMS})
     stream_url = request.build_absolute_uri(
-        reverse("cameras:camera_mjpeg_feed") + f"?camera={camera.id}&token={token}"
+        reverse("cameras:camera_mjpeg_feed") + "?" + urlencode(params)
     )
     return render(
         request,
@@ -240,30 +365,124 @@ def camera_stream(request):
 
 
 @login_required
-def capture_frame(request, camera_id):
-    camera = get_object_or_404(Camera, pk=camera_id)
-    cap = cv2.VideoCapture(camera.rtsp_url)
-    success, frame = cap.read()
-    cap.release()
-    if not success:
+def mosaic_feed(request):
+    # ?cameras=1,2,3 (por defecto todas), ?cols=N, ?width= y ?height=: una
+    # sola conexión MJPEG con todas las cámaras compuestas en el servidor.
+    options = settings.CAMERA_MOSAIC
+    cameras = Camera.objects.order_by("id")
+    try:
+        if request.GET.get("cameras"):
+            ids = [int(pk) for pk in request.GET["cameras"].split(",") if pk]
+            by_id = cameras.in_bulk(ids)
+            cameras = [by_id[pk] for pk in dict.fromkeys(ids) if pk in by_id]
+        else:
+            cameras = list(cameras[:options["max_cameras"]])
+        width = min(max(int(request.GET.get("width") or options["width"]), 320), 3840)
+        height = min(max(int(request.GET.get("height") or options["height"]), 240), 2160)
+        columns = int(request.GET.get("cols") or 0)
+    except ValueError:
+        return HttpResponseBadRequest("Parámetros de mosaico inválidos.")
+    if not cameras:
+        raise Http404("No hay cámaras para el mosaico.")
+    if len(cameras) > options["max_cameras"]:
+        return HttpResponseBadRequest(f"Máximo {options['max_cameras']} cámaras por mosaico.")
+    columns = min(max(columns or math.ceil(math.sqrt(len(cameras))), 1), len(cameras))
+
+    hub = get_mosaic(cameras, columns, (width, height), options["fps"])
+    # Tamaño ya fijo: el perfil solo limita fps y fija la calidad
+    profile = StreamProfile(None, options["fps"], options["quality"])
+    frames = agen_camera_frames if settings.CAMERA_ASYNC_STREAMING else gen_camera_frames
+    return StreamingHttpResponse(
+        frames(hub, profile),
+        content_type="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
+async def capture_frame(request, camera_id):
+    # Asíncrona: esperar a una cámara en frío (o caída) no ocupa el hilo que
+    # Django comparte entre las vistas síncronas bajo ASGI.
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    camera = await get_camera_async(camera_id)
+    hub = get_hub(camera)
+    seq, frame = await hub.snapshot_async()
+    if frame is None:
         return HttpResponse("No se pudo capturar la imagen", status=500)
-    ok, jpeg = cv2.imencode(".jpg", frame)
-    if not ok:
+    image_bytes = await hub.get_jpeg_async(seq, frame)
+    if image_bytes is None:
         return HttpResponse("Error al codificar la imagen", status=500)
-    image_bytes = jpeg.tobytes()
-    captures_dir = settings.MEDIA_ROOT / "captures"
-    os.makedirs(captures_dir, exist_ok=True)
-    filename = f"capture_camera_{camera.id}_{SecurityCode.objects.count()}.jpg"
-    filepath = captures_dir / filename
+    return await sync_to_async(save_manual_capture)(request, camera, frame, image_bytes)
+
+
+def save_manual_capture(request, camera, frame, image_bytes):
+    # Si es casi idéntica a una captura de hace unos segundos, no se guarda otra copia
+    phash = dhash(frame)
+    created_at = timezone.now()
+    window = getattr(settings, "CAPTURE_DEDUP_WINDOW_SECONDS", 60)
+    recent = Capture.recent_hashes(camera.id, since=created_at - timedelta(seconds=window))
+    if is_near_duplicate(phash, recent, settings.CAPTURE_DEDUP_MAX_DISTANCE):
+        messages.info(
+            request,
+            f"No se guardó la captura de {camera.name}: es casi idéntica a otra "
+            f"de los últimos {window} segundos.",
+        )
+        return redirect("cameras:captures_gallery")
+    name = capture_name(camera.id, "capture_camera", created_at)
+    filepath = settings.MEDIA_ROOT / name
+    os.makedirs(filepath.parent, exist_ok=True)
     with open(filepath, "wb") as f:
         f.write(image_bytes)
-    Capture.objects.create(camera=camera, image=f"captures/{filename}")
+    Capture.objects.create(
+        camera=camera, image=name, created_at=created_at, size_bytes=len(image_bytes), phash=phash
+    )
     return redirect("cameras:captures_gallery")
 
 
+async def camera_snapshot(request, camera_id):
+    # JPEG del frame actual (pantallas murales): GET simple, sin guardar nada
+    if not await is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    camera = await get_camera_async(camera_id)
+    try:
+        profile = resolve_profile(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest("Perfil de stream inválido.")
+    token = request.GET.get("token")
+    if token:
+        error = await token_error_async(camera, token)
+        if error:
+            return HttpResponseForbidden(error)
+    hub = get_hub(camera)
+    seq, frame = await hub.snapshot_async()
+    if frame is None:
+        return HttpResponse("No se pudo obtener la imagen", status=503)
+    image_bytes = await hub.get_jpeg_async(seq, frame, profile)
+    if image_bytes is None:
+        return HttpResponse("Error al codificar la imagen", status=500)
+    response = HttpResponse(image_bytes, content_type="image/jpeg")
+    response["Cache-Control"] = "no-store"
+    response["Last-Modified"] = http_date(hub.frame_time)
+    return response
+
+
+@login_required
+def capture_thumbnail(request, capture_id, size):
+    if size not in thumbnail_sizes():
+        raise Http404("Tamaño de miniatura desconocido.")
+    capture = get_object_or_404(Capture.objects.only("id", "image"), pk=capture_id)
+    try:
+        path = get_thumbnail(capture, size)
+    except FileNotFoundError:
+        raise Http404("La captura original no existe.")
+    response = FileResponse(open(path, "rb"), content_type="image/jpeg")
+    # La miniatura de una captura nunca cambia
+    response["Cache-Control"] = "private, max-age=604800, immutable"
+    return response
+
+
 @login_required
 def captures_gallery(request):
-    captures = Capture.objects.select_related("camera").order_by("-created_at")
+    captures = Capture.objects.select_related("camera")
     all_cameras = Camera.objects.all()
     
     date_from = request.GET.get("date_from")
@@ -276,15 +495,134 @@ def captures_gallery(request):
         captures = captures.filter(created_at__lte=date_to)
     if camera_id:
         captures = captures.filter(camera_id=camera_id)
-        
+
+    # Paginación por cursor (keyset) sobre (created_at, id): cada página es un
+    # rango del índice, cueste lo mismo la primera que la página N.
+    try:
+        page_size = int(request.GET.get("page_size") or settings.CAPTURES_PAGE_SIZE)
+        before = parse_cursor(request.GET.get("before"))
+        after = parse_cursor(request.GET.get("after"))
+    except (ValueError, OverflowError):
+        return HttpResponseBadRequest("Parámetros de página inválidos.")
+    page_size = min(max(page_size, 1), MAX_CAPTURES_PAGE_SIZE)
+
+    if after:
+        created_at, pk = after
+        page = list(
+            captures.filter(created_at__gte=created_at)
+            .exclude(created_at=created_at, pk__lte=pk)
+            .order_by("created_at", "id")[:page_size + 1]
+        )
+        has_newer, has_older = len(page) > page_size, True
+        page = page[:page_size][::-1]
+    else:
+        if before:
+            created_at, pk = before
+            captures = captures.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+        page = list(captures.order_by("-created_at", "-id")[:page_size + 1])
+        has_newer, has_older = before is not None, len(page) > page_size
+        page = page[:page_size]
+
+    params = {k: v for k, v in request.GET.items() if k in ("date_from", "date_to", "camera", "page_size") and v}
+    older_url = newer_url = None
+    if page and has_older:
+        older_url = "?" + urlencode({**params, "before": make_cursor(page[-1])})
+    if page and has_newer:
+        newer_url = "?" + urlencode({**params, "after": make_cursor(page[0])})
+
     return render(request, "cameras/captures.html", {
-        "captures": captures,
+        "captures": page,
         "date_from": date_from,
         "date_to": date_to,
         "all_cameras": all_cameras,
         "selected_camera": int(camera_id) if camera_id else None,
+        "page_size": request.GET.get("page_size", ""),
+        "older_url": older_url,
+        "newer_url": newer_url,
     })
 
+
+def make_cursor(capture):
+    # "<microsegundos desde epoch>-<id>": exacto y seguro para URLs
+    delta = capture.created_at - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{capture.id}"
+
+
+def parse_cursor(value):
+    if not value:
+        return None
+    micros, pk = value.split("-")
+    pk = int(pk)
+    # Fuera de rango para datetime o para un INTEGER de SQLite: cursor inválido
+    if not 0 < pk < 2 ** 63:
+        raise ValueError(value)
+    return EPOCH + timedelta(microseconds=int(micros)), pk
+
+@login_required
+def motion_events(request):
+    events = MotionEvent.objects.select_related("camera", "key_frame").order_by("-started_at")
+    all_cameras = Camera.objects.all()
+
+    date_from = request.GET.get("date_from")
+    date_to = request.GET.get("date_to")
+    camera_id = request.GET.get("camera")
+
+    # Eventos que se solapan con el rango: usa el índice (camera, started_at),
+    # acotado por abajo con la duración máxima de un evento
+    try:
+        start = parse_datetime(date_from) if date_from else None
+        end = parse_datetime(date_to) if date_to else None
+    except ValueError:
+        start = end = None
+    if (date_from and start is None) or (date_to and end is None):
+        return HttpResponseBadRequest("Rango de fechas inválido.")
+    start, end = [timezone.make_aware(d) if d and timezone.is_naive(d) else d for d in (start, end)]
+    if camera_id:
+        events = events.filter(camera_id=camera_id)
+    if end:
+        events = events.filter(started_at__lte=end)
+    if start:
+        events = events.filter(started_at__gte=start - MotionEvent.MAX_DURATION, ended_at__gte=start)
+
+    return render(request, "cameras/events.html", {
+        "events": events[:EVENTS_PAGE_SIZE],
+        "date_from": date_from,
+        "date_to": date_to,
+        "all_cameras": all_cameras,
+        "selected_camera": int(camera_id) if camera_id else None,
+    })
+
+
+@login_required
+def recording_playback(request, camera_id):
+    # ?at=AAAA-MM-DDTHH:MM[:SS]: redirige al segmento que contiene ese
+    # instante, posicionado con un fragmento #t= (búsqueda por índice, sin
+    # recorrer directorios).
+    camera = get_object_or_404(Camera, pk=camera_id)
+    try:
+        at = parse_datetime(request.GET.get("at", ""))
+    except ValueError:
+        at = None
+    if at is None:
+        return HttpResponseBadRequest("Instante inválido.")
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    segment = RecordingSegment.at(camera.id, at)
+    if segment is None:
+        raise Http404("No hay grabación de esta cámara en ese instante.")
+    offset = int((at - segment.started_at).total_seconds())
+    return redirect(f"{segment.file.url}#t={offset}")
+
+
+def metrics_view(request):
+    # Formato de texto de Prometheus; solo para el personal o IPs permitidas
+    allowed = request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff):
+        return HttpResponseForbidden("Acceso denegado.")
+    return HttpResponse(metrics.render(extra=[metrics.storage_metrics]), content_type=metrics.CONTENT_TYPE)
+
+
 @login_required
 def delete_camera(request, camera_id):
     camera = get_object_or_404(Camera, pk=camera_id)
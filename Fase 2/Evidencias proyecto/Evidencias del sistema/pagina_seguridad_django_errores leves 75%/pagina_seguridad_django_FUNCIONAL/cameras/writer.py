@@ -0,0 +1,183 @@
+import io
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from .metrics import CAPTURE_WRITE_SECONDS
+from .models import Capture, MotionEvent
+from .thumbnails import save_thumbnail
+
+
+# Captura pendiente de escribir. `key_frame_of` es el id del MotionEvent del
+# que esta captura pasa a ser el frame clave (o None).
+CaptureJob = namedtuple(
+    "CaptureJob", ["camera_id", "name", "jpeg", "created_at", "event_id", "key_frame_of", "phash"]
+)
+
+
+class CaptureWriter:
+    # Cola acotada de capturas drenada por un hilo de fondo: escribe los
+    # archivos y crea las filas con bulk_create por lotes. Si la cola está
+    # llena la captura se descarta (y se cuenta) en vez de frenar el video.
+
+    def __init__(self, max_queue=256, batch_size=50, max_retries=5):
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._known_dirs = set()
+
+    def submit(self, camera_id, name, jpeg, event_id=None, key_frame_of=None, phash=None):
+        self._ensure_started()
+        job = CaptureJob(camera_id, name, jpeg, timezone.now(), event_id, key_frame_of, phash)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self.queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def close(self, timeout=10):
+        # Vacía la cola pendiente antes de terminar el proceso
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    return
+                batch = [job]
+                while len(batch) < self.batch_size:
+                    try:
+                        job = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._write_batch(batch)
+                        return
+                    batch.append(job)
+                self._write_batch(batch)
+        finally:
+            connection.close()
+
+    def _write_file(self, job):
+        path = settings.MEDIA_ROOT / job.name
+        if path.parent not in self._known_dirs:
+            os.makedirs(path.parent, exist_ok=True)
+            self._known_dirs.add(path.parent)
+        with open(path, "wb") as f:
+            f.write(job.jpeg)
+
+    def _write_batch(self, batch):
+        written = []
+        for job in batch:
+            try:
+                self._write_file(job)
+                written.append(job)
+            except OSError as e:
+                print(f"Error al guardar captura {job.name}: {e}")
+        captures = [
+            Capture(
+                camera_id=job.camera_id,
+                image=job.name,
+                created_at=job.created_at,
+                size_bytes=len(job.jpeg),
+                phash=job.phash,
+                event_id=job.event_id,
+            )
+            for job in written
+        ]
+        try:
+            self._with_retries(Capture.objects.bulk_create, captures)
+        except OperationalError as e:
+            print(f"Error al registrar {len(captures)} capturas: {e}")
+            for job in written:
+                (settings.MEDIA_ROOT / job.name).unlink(missing_ok=True)
+            with self._lock:
+                self.failed += len(batch)
+            return
+        with self._lock:
+            self.written += len(written)
+            self.failed += len(batch) - len(written)
+        now = timezone.now()
+        for job in written:
+            CAPTURE_WRITE_SECONDS.observe((now - job.created_at).total_seconds(), job.camera_id)
+        try:
+            self._with_retries(self._link_key_frames, written, captures)
+        except OperationalError as e:
+            print(f"Error al enlazar frames clave: {e}")
+        self._make_thumbnails(written, captures)
+
+    def _with_retries(self, fn, *args):
+        # p. ej. "database is locked" en SQLite: reintento con espera creciente
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return fn(*args)
+            except OperationalError:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(0.2 * attempt)
+
+    def _make_thumbnails(self, jobs, captures):
+        # La miniatura de la galería se genera desde los bytes ya en memoria;
+        # las demás (o si el backend no devolvió el id) se crean al pedirlas.
+        for job, capture in zip(jobs, captures):
+            if capture.pk is None:
+                continue
+            try:
+                save_thumbnail(capture.pk, "small", io.BytesIO(job.jpeg))
+            except (OSError, ValueError) as e:
+                print(f"Error al generar miniatura de {job.name}: {e}")
+
+    def _link_key_frames(self, jobs, captures):
+        for job, capture in zip(jobs, captures):
+            if job.key_frame_of is None:
+                continue
+            # Algunos backends no devuelven el id tras bulk_create
+            pk = capture.pk or Capture.objects.filter(image=job.name).values_list("pk", flat=True).first()
+            MotionEvent.objects.filter(pk=job.key_frame_of).update(key_frame_id=pk)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = CaptureWriter(
+                max_queue=getattr(settings, "CAPTURE_WRITER_QUEUE_SIZE", 256),
+                batch_size=getattr(settings, "CAPTURE_WRITER_BATCH_SIZE", 50),
+            )
+        return _writer
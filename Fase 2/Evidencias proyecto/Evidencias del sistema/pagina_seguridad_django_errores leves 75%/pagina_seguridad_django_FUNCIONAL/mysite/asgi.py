@@ -0,0 +1,14 @@
+import os
+from django.core.asgi import get_asgi_application
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+# Servido con un servidor ASGI (p. ej. `uvicorn mysite.asgi:application`),
+# camera_mjpeg_feed usa la ruta asíncrona en lugar de un hilo por visor.
+os.environ.setdefault("CAMERA_STREAM_MODE", "async")
+application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CAMERA_WARM_START:
+    from cameras.hub import warm_start
+
+    warm_start()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "unsafe-dev-secret-key"
@@ -32,11 +33,21 @@ TEMPLATES = [
     }
 ]
 WSGI_APPLICATION = "mysite.wsgi.application"
+ASGI_APPLICATION = "mysite.asgi.application"
 DATABASES = {"default":{"ENGINE":"django.db.backends.sqlite3","NAME": BASE_DIR / "db.sqlite3"}}
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # Compartida por todos los procesos del servidor y persistente entre
+    # reinicios (tokens revocados); con varias máquinas, usar Redis o la BD.
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "shared",
+    },
+}
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/home/"
 
@@ -60,3 +71,101 @@ AXES_FAILURE_LIMIT = 5
 AXES_COOLOFF_TIME = 1  # hours
 AXES_LOCKOUT_TEMPLATE = 'cameras/lockout.html'
 AXES_RESET_ON_SUCCESS = True
+
+# Cámaras
+CAMERA_HUB_GRACE_SECONDS = 15  # segundos que el decodificador sigue vivo sin visores
+CAMERA_DECODE_WORKERS = 32  # aperturas/lecturas OpenCV simultáneas por proceso (no limita las cámaras activas)
+# Cada proceso tiene sus propios hubs: una cámara con detección o grabación
+# (run_detectors) que además se está mirando abre una sesión RTSP en el
+# proceso detector y otra en cada proceso web con visores. Hay que contarlas
+# en el límite de sesiones simultáneas de la cámara/NVR.
+# Reconexión RTSP: espera exponencial con jitter entre estos límites (segundos)
+CAMERA_RECONNECT_INITIAL_DELAY = 0.5
+CAMERA_RECONNECT_MAX_DELAY = 30
+CAMERA_IO_TIMEOUT_SECONDS = 10  # apertura/lectura sin respuesta = conexión caída
+# Opciones de FFmpeg para baja latencia (el transporte tcp/udp es por cámara)
+CAMERA_CAPTURE_OPTIONS = "fflags;nobuffer|flags;low_delay"
+# Conectar las cámaras con keep_warm al arrancar el servidor web
+CAMERA_WARM_START = True
+# Capturas instantáneas: se usa el último frame del hub si tiene menos de N
+# segundos; en frío se descartan los primeros frames (suelen llegar grises).
+CAMERA_SNAPSHOT_MAX_AGE = 2
+CAMERA_SNAPSHOT_WARMUP_FRAMES = 5
+# mysite/asgi.py activa el streaming MJPEG asíncrono (un await por visor, no un hilo)
+CAMERA_ASYNC_STREAMING = os.environ.get("CAMERA_STREAM_MODE") == "async"
+
+# Perfiles de stream (?profile=...); el escalado y la codificación se hacen
+# una vez por perfil activo y cámara, no por visor.
+CAMERA_STREAM_PROFILES = {
+    "mobile": {"max_width": 640, "fps": 8, "quality": 60},
+    "desktop": {"max_width": 1280, "fps": 15, "quality": 75},
+    "wall": {"max_width": 1920, "fps": 25, "quality": 85},
+}
+CAMERA_QR_PROFILE = "mobile"
+
+# Mosaico (/mosaic/): varias cámaras en un solo stream MJPEG de tamaño fijo
+CAMERA_MOSAIC = {"width": 1920, "height": 1080, "fps": 10, "quality": 75, "max_cameras": 25}
+
+# Tokens de acceso por QR: "signed" (firmados con SECRET_KEY, se validan sin
+# consultar la BD) o "db" (una fila SecurityCode por token, como antes).
+CAMERA_TOKEN_MODE = "signed"
+# En modo "signed", guardar igualmente una fila SecurityCode como registro
+CAMERA_TOKEN_AUDIT = False
+# Cache con la lista de tokens firmados revocados. Debe ser común a todos los
+# workers: con LocMemCache, "Revocar" solo afectaría al proceso que recibió el POST.
+CAMERA_TOKEN_REVOCATION_CACHE = "shared"
+
+# Escritura de capturas en segundo plano (cola acotada + bulk_create por lotes)
+CAPTURE_WRITER_QUEUE_SIZE = 256
+CAPTURE_WRITER_BATCH_SIZE = 50
+
+CAPTURES_PAGE_SIZE = 60  # capturas por página en la galería (?page_size=, máx. 200)
+
+# Retención global de capturas (enforce_retention); cada cámara puede
+# sobrescribir estos valores. None desactiva la regla.
+CAPTURE_RETENTION = {
+    "max_age_days": 90,
+    "max_bytes_per_camera": None,
+    # Pasados N días se conserva solo una captura por hora
+    "downsample_after_days": 14,
+    # Segmentos de grabación continua (Camera.recording_retention_days)
+    "recording_max_age_days": 30,
+}
+
+# Clips de movimiento: buffer en memoria de JPEG reducidos (acotado por
+# segundos y bytes por cámara) y MP4 con pre-roll + post-roll por captura.
+CAPTURE_CLIPS = {
+    "enabled": True,
+    "pre_seconds": 5,
+    "post_seconds": 5,
+    "max_seconds": 30,
+    "fps": 8,
+    "buffer_bytes": 8 * 1024 * 1024,
+    "max_width": 960,
+    "quality": 70,
+    "fourcc": "mp4v",
+}
+
+# Grabación continua (Camera.record_continuously): segmentos MP4 de duración
+# fija a fps constantes, decodificados una sola vez por el CameraHub.
+CAMERA_RECORDING = {
+    "segment_seconds": 60,
+    "max_segment_bytes": 64 * 1024 * 1024,
+    "fps": 10,
+    "max_width": 1280,
+    "fourcc": "mp4v",
+}
+
+# Deduplicación por hash perceptual: una captura nueva se descarta si está a
+# esta distancia de Hamming (de 64 bits) o menos de alguna de las N recientes
+# de los últimos CAPTURE_DEDUP_WINDOW_SECONDS. Las automáticas solo se comparan
+# dentro del mismo MotionEvent: la primera captura de cada evento se guarda siempre.
+CAPTURE_DEDUP_MAX_DISTANCE = 5
+CAPTURE_DEDUP_RECENT = 8
+CAPTURE_DEDUP_WINDOW_SECONDS = 60
+
+# /metrics (formato Prometheus): accesible para el personal o desde estas IPs
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+# Miniaturas de capturas (nombre -> ancho máximo), en media/thumbs/
+CAPTURE_THUMBNAIL_SIZES = {"small": 320, "medium": 640}